@@ -0,0 +1,423 @@
+"""
+Advanced Chunking Strategies for RAG Pipeline
+Token-based, sentence-based, recursive and semantic chunking with tiktoken
+"""
+
+import re
+import functools
+from typing import List, NamedTuple, Optional
+import logging
+import numpy as np
+import tiktoken
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Compiled once at import — re.split rebuilt this pattern on every call
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+# Separator ladder for recursive splitting, coarsest first
+_SEPARATORS = ['\n\n\n', '\n\n', '\n', '. ', ' ']
+
+try:
+    import ahocorasick
+
+    _SEP_AUTOMATON = ahocorasick.Automaton()
+    for _i, _sep in enumerate(_SEPARATORS):
+        _SEP_AUTOMATON.add_word(_sep, _i)
+    _SEP_AUTOMATON.make_automaton()
+
+    def _first_separator_index(text: str, start: int = 0) -> Optional[int]:
+        """
+        Index of the coarsest separator (>= start) present in text.
+
+        One Aho-Corasick pass over the text instead of one substring
+        scan per separator.
+        """
+        best = None
+        for _, i in _SEP_AUTOMATON.iter(text):
+            if i >= start and (best is None or i < best):
+                best = i
+                if best == start:
+                    break
+        return best
+
+except ImportError:  # pyahocorasick is optional — fall back to N scans
+
+    def _first_separator_index(text: str, start: int = 0) -> Optional[int]:
+        """Index of the coarsest separator (>= start) present in text"""
+        for i in range(start, len(_SEPARATORS)):
+            if _SEPARATORS[i] in text:
+                return i
+        return None
+
+
+def _split_sentences(text: str) -> List[str]:
+    """Split text into sentences by slicing between separator spans"""
+    sentences = []
+    prev = 0
+    for m in _SENT_SPLIT.finditer(text):
+        s = text[prev:m.start()]
+        if s and not s.isspace():
+            sentences.append(s)
+        prev = m.end()
+    tail = text[prev:]
+    if tail and not tail.isspace():
+        sentences.append(tail)
+    return sentences
+
+
+def _pack_sentence_spans(lengths, max_tokens, overlap):
+    """
+    Greedy sentence packing over a token-length array.
+
+    Returns (starts, ends) sentence-index boundaries of each chunk. Pure
+    integer arithmetic — compiled with Numba below when available.
+    """
+    n = lengths.shape[0]
+    starts = np.empty(n, np.int32)
+    ends = np.empty(n, np.int32)
+    k = 0
+    start = 0
+    current = 0
+    for i in range(n):
+        li = lengths[i]
+        if current + li > max_tokens and current > 0:
+            starts[k] = start
+            ends[k] = i
+            k += 1
+            # Walk back from i until the overlap token budget is filled
+            acc = 0
+            j = i
+            while j > start and acc + lengths[j - 1] < overlap:
+                acc += lengths[j - 1]
+                j -= 1
+            start = j
+            current = acc
+        current += li
+    if start < n:
+        starts[k] = start
+        ends[k] = n
+        k += 1
+    return starts[:k], ends[:k]
+
+
+try:
+    from numba import njit
+    _pack_sentence_spans = njit(cache=True)(_pack_sentence_spans)
+except ImportError:  # numba is optional — the pure-Python loop still works
+    pass
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoding(name: str):
+    """Build a tiktoken encoding once per process and share it"""
+    return tiktoken.get_encoding(name)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_st_model(model_name: str):
+    """Load a SentenceTransformer once per process and reuse it"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+class ChunkStats(NamedTuple):
+    """Statistics about a list of chunks"""
+    total_chunks: int
+    total_tokens: int
+    avg_tokens_per_chunk: int
+    min_tokens: int
+    max_tokens: int
+    avg_chunk_size: int
+
+
+class AdvancedChunker:
+    """
+    Chunking strategies beyond the plain SentenceSplitter:
+    fixed token windows, sentence packing, recursive separator
+    splitting and embedding-based semantic splitting.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        model_name: str = 'cl100k_base'
+    ):
+        """
+        Initialize chunker
+
+        Args:
+            chunk_size: Target chunk size in tokens
+            chunk_overlap: Overlap between chunks in tokens
+            model_name: tiktoken encoding name
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer = _get_encoding(model_name)
+        # Batch encode API (one FFI call for N texts) — available on all
+        # recent tiktoken releases; fall back to per-text encode if missing.
+        self._encode_batch = getattr(self.tokenizer, 'encode_ordinary_batch', None)
+        self._decode_batch = getattr(self.tokenizer, 'decode_batch', None)
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens in text"""
+        return len(self.tokenizer.encode_ordinary(text))
+
+    def _sentence_token_lengths(self, sentences: List[str]) -> np.ndarray:
+        """Token length per sentence via a single batched encode"""
+        if self._encode_batch is not None:
+            encoded = self._encode_batch(sentences)
+        else:
+            encoded = [self.tokenizer.encode_ordinary(s) for s in sentences]
+        return np.fromiter(
+            (len(e) for e in encoded), dtype=np.int32, count=len(sentences)
+        )
+
+    def chunk_by_sentences(self, text: str) -> List[str]:
+        """
+        Pack whole sentences into chunks up to chunk_size tokens,
+        carrying chunk_overlap tokens of trailing sentences over.
+        """
+        sentences = _split_sentences(text)
+        if not sentences:
+            return []
+
+        # One batched encode instead of one tokenizer call per sentence;
+        # the packing itself is a compiled integer loop over the lengths
+        lengths = self._sentence_token_lengths(sentences)
+        starts, ends = _pack_sentence_spans(lengths, self.chunk_size, self.chunk_overlap)
+
+        return [' '.join(sentences[s:e]) for s, e in zip(starts, ends)]
+
+    def chunk_by_tokens(self, text: str) -> List[str]:
+        """
+        Split text into fixed-size token windows with overlap
+        """
+        tokens = self.tokenizer.encode_ordinary(text)
+        n = len(tokens)
+        if n == 0:
+            return []
+
+        # Vectorized window math, then one batched decode instead of one
+        # FFI call per chunk
+        stride = max(self.chunk_size - self.chunk_overlap, 1)
+        starts = np.arange(0, n, stride, dtype=np.int64)
+        ends = np.minimum(starts + self.chunk_size, n)
+
+        # Drop trailing windows fully contained in the previous one
+        keep = starts < n
+        if len(starts) > 1:
+            keep &= np.concatenate(([True], ends[1:] > ends[:-1]))
+        starts, ends = starts[keep], ends[keep]
+
+        slices = [tokens[s:e] for s, e in zip(starts, ends)]
+        if self._decode_batch is not None:
+            return self._decode_batch(slices)
+        return [self.tokenizer.decode(s) for s in slices]
+
+    def chunk_recursive(self, text: str) -> List[str]:
+        """
+        Recursively split on progressively finer separators
+        (paragraphs, lines, sentences, words) until chunks fit.
+        """
+        return self._recursive_split(text, 0)
+
+    def _recursive_split(
+        self,
+        text: str,
+        sep_start: int = 0,
+        text_tokens: Optional[int] = None
+    ) -> List[str]:
+        """
+        Split text on the coarsest separator at or after sep_start in
+        _SEPARATORS, recursing on oversized parts.
+        """
+        # isspace() is a C-level scan — no stripped copy just to test emptiness
+        if not text or text.isspace():
+            return []
+
+        # The caller usually already tokenized this piece — don't redo it
+        if text_tokens is None:
+            text_tokens = self.count_tokens(text)
+        if text_tokens <= self.chunk_size:
+            return [text]
+
+        # One pass over the text finds the separator to use, instead of
+        # one `in`-scan per remaining separator
+        sep_i = _first_separator_index(text, sep_start)
+        if sep_i is None:
+            # No separator left — hard split
+            return self._split_long_text(text)
+
+        separator = _SEPARATORS[sep_i]
+        splits = text.split(separator)
+
+        # Tokenize all pieces once; accumulate parts in a list and
+        # join only on flush instead of rebuilding the candidate
+        # string (and re-tokenizing it) on every append.
+        lengths = self._sentence_token_lengths(splits)
+        sep_tokens = self.count_tokens(separator)
+
+        chunks = []
+        current_parts: List[str] = []
+        current_tokens = 0
+        for split, split_tokens in zip(splits, lengths):
+            split_tokens = int(split_tokens)
+            added = split_tokens + (sep_tokens if current_parts else 0)
+            if current_tokens + added <= self.chunk_size:
+                current_parts.append(split)
+                current_tokens += added
+            else:
+                if current_parts:
+                    chunks.append(separator.join(current_parts))
+                if split_tokens > self.chunk_size:
+                    chunks.extend(self._recursive_split(split, sep_i + 1, split_tokens))
+                    current_parts = []
+                    current_tokens = 0
+                else:
+                    current_parts = [split]
+                    current_tokens = split_tokens
+
+        if current_parts:
+            chunks.append(separator.join(current_parts))
+        return chunks
+
+    def _split_long_text(self, text: str) -> List[str]:
+        """Hard-split text that has no usable separators"""
+        max_chars = self.chunk_size * 4  # rough chars-per-token ratio
+        chunks = []
+        i = 0
+        n = len(text)
+        while i < n:
+            end = min(i + max_chars, n)
+            snapped = False
+            if end < n:
+                # Snap to the last space in the trailing half of the window
+                # so we do not cut mid-word
+                cut = text.rfind(' ', i + max_chars // 2, end)
+                if cut > 0:
+                    end = cut
+                    snapped = True
+            chunks.append(text[i:end])
+            i = end + 1 if snapped else end
+        return chunks
+
+    def chunk_by_semantic_similarity(
+        self,
+        text: str,
+        similarity_threshold: float = 0.5,
+        embedding_model: str = 'all-MiniLM-L6-v2'
+    ) -> List[str]:
+        """
+        Split at points where sentence embeddings drift away from the
+        running chunk centroid (topic shifts).
+        """
+        sentences = _split_sentences(text)
+        if not sentences:
+            return []
+
+        # Model is loaded once per process; large batches let the encoder
+        # pad to the local max per mini-batch instead of the global max.
+        model = _get_st_model(embedding_model)
+        embeddings = model.encode(
+            sentences,
+            batch_size=1024,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+        # Embeddings come back unit-norm (normalize_embeddings=True), so
+        # cosine similarity against the centroid is one BLAS dot product
+        # once the centroid itself is scaled to unit length. The centroid
+        # is tracked as a running sum + count, O(1) per step.
+        chunks = []
+        current_sentences = [sentences[0]]
+        running_sum = embeddings[0].copy()
+        running_count = 1
+
+        for i in range(1, len(sentences)):
+            mean_norm = np.linalg.norm(running_sum)
+            similarity = (
+                float(np.dot(running_sum, embeddings[i]) / mean_norm)
+                if mean_norm else 0.0
+            )
+
+            if similarity >= similarity_threshold:
+                current_sentences.append(sentences[i])
+                running_sum += embeddings[i]
+                running_count += 1
+            else:
+                chunks.append(' '.join(current_sentences))
+                current_sentences = [sentences[i]]
+                running_sum = embeddings[i].copy()
+                running_count = 1
+
+        if current_sentences:
+            chunks.append(' '.join(current_sentences))
+
+        return chunks
+
+    def calculate_stats(self, chunks: List[str]) -> Optional[ChunkStats]:
+        """Calculate statistics for a list of chunks"""
+        if not chunks:
+            return None
+
+        chunk_sizes = np.fromiter(
+            (len(c) for c in chunks), dtype=np.int32, count=len(chunks)
+        )
+        if self.tokenizer is not None:
+            # One batched encode for the whole list instead of N calls
+            chunk_tokens = self._sentence_token_lengths(chunks)
+        else:
+            chunk_tokens = chunk_sizes // 4  # rough chars-per-token estimate
+
+        return ChunkStats(
+            total_chunks=len(chunks),
+            total_tokens=int(chunk_tokens.sum()),
+            avg_tokens_per_chunk=int(chunk_tokens.mean()),
+            min_tokens=int(chunk_tokens.min()),
+            max_tokens=int(chunk_tokens.max()),
+            avg_chunk_size=int(chunk_sizes.mean())
+        )
+
+
+def compare_chunking_strategies(text: str, chunk_size: int = 500) -> None:
+    """Run every strategy on the same text and print stats side by side"""
+    chunker = AdvancedChunker(chunk_size=chunk_size)
+
+    strategies = {
+        'tokens': chunker.chunk_by_tokens,
+        'sentences': chunker.chunk_by_sentences,
+        'recursive': chunker.chunk_recursive,
+    }
+
+    print("\n" + "=" * 70)
+    print("CHUNKING STRATEGY COMPARISON")
+    print("=" * 70)
+
+    for name, strategy in strategies.items():
+        chunks = strategy(text)
+        stats = chunker.calculate_stats(chunks)
+        print(f"\n{name.upper()}:")
+        print(f"  Chunks: {stats.total_chunks}")
+        print(f"  Avg tokens/chunk: {stats.avg_tokens_per_chunk}")
+        print(f"  Min/Max tokens: {stats.min_tokens}/{stats.max_tokens}")
+
+
+def main():
+    """Example usage"""
+    sample = (
+        "Machine learning is a subset of artificial intelligence. "
+        "It focuses on algorithms that learn from data. "
+        "Deep learning uses neural networks with many layers. "
+        "These models have achieved remarkable results in vision and language tasks."
+    ) * 50
+
+    compare_chunking_strategies(sample, chunk_size=200)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""
+SQLite Chunk Store
+Indexed storage for embedded chunks, as an alternative to embedded_chunks.json.
+
+Removing one PDF from the JSON export means rewriting the whole file;
+here it is a single indexed DELETE. Embeddings are stored as raw float32
+bytes (np.ndarray.tobytes), so loading into ChromaDB streams row by row
+without rehydrating the entire file into Python objects first.
+
+Usage:
+    python chunk_store.py <embedded_chunks.json> [chunks.db] [dtype]
+        — migrate an existing JSON/JSONL export into chunks.db;
+          dtype is float32 (default), float16, or int8
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+from typing import Dict, Iterable, Iterator
+
+import numpy as np
+
+try:
+    # orjson parses the float-heavy records in C; stdlib json is the fallback
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "./output/chunks.db"
+
+
+def _iter_records(path: str):
+    """
+    Yield embedded-chunk records from JSONL or a legacy JSON array.
+
+    Document-header records ({"record_type": "document", ...}) carry the
+    shared metadata for the chunk lines that follow; it is re-attached
+    here so every yielded chunk is self-contained.
+    """
+    doc_meta: Dict[str, Dict] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            records = json.load(f)
+        else:
+            records = (_loads(line) for line in f if line.strip())
+
+        for record in records:
+            if record.get('record_type') == 'document':
+                doc_meta[record.get('source_file', '')] = record.get('metadata', {})
+                continue
+            if 'metadata' not in record:
+                record['metadata'] = doc_meta.get(record.get('source_file', ''), {})
+            yield record
+
+
+class ChunkStore:
+    """
+    SQLite-backed store for embedded chunks.
+
+    chunk_id is the primary key; source_file and its basename are both
+    indexed so delete_by_source touches only the matching rows.
+
+    embedding_dtype controls how vectors are stored: 'float32' (exact),
+    'float16' (half the bytes, negligible recall impact for cosine
+    search), or 'int8' (quarter the bytes; symmetric per-vector
+    quantization with an fp32 scale, recall typically within 1-2%).
+    Mixed dtypes can coexist — each row records its own dtype and is
+    dequantized to float32 on read.
+    """
+
+    EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 embedding_dtype: str = 'float32'):
+        if embedding_dtype not in self.EMBEDDING_DTYPES:
+            raise ValueError(
+                f"embedding_dtype must be one of {self.EMBEDDING_DTYPES}, "
+                f"got {embedding_dtype!r}")
+        self.embedding_dtype = embedding_dtype
+        self.db_path = db_path
+        dirname = os.path.dirname(db_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=wal")
+        self.conn.execute("PRAGMA synchronous=normal")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " chunk_id TEXT PRIMARY KEY,"
+            " source_file TEXT NOT NULL,"
+            " filename TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " page_numbers TEXT,"
+            " metadata TEXT,"
+            " embedding BLOB,"
+            " embedding_dtype TEXT NOT NULL DEFAULT 'float32',"
+            " embedding_scale REAL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source_file)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunks_filename ON chunks(filename)")
+        self.conn.commit()
+
+    def _encode_embedding(self, embedding) -> tuple:
+        """Return (blob, scale) for the configured embedding_dtype"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        if self.embedding_dtype == 'int8':
+            scale = float(np.abs(vec).max()) / 127.0 or 1.0
+            return np.round(vec / scale).astype(np.int8).tobytes(), scale
+        if self.embedding_dtype == 'float16':
+            return vec.astype(np.float16).tobytes(), None
+        return vec.tobytes(), None
+
+    @staticmethod
+    def _decode_embedding(blob, dtype: str, scale) -> np.ndarray:
+        if dtype == 'int8':
+            return np.frombuffer(blob, dtype=np.int8).astype(np.float32) * scale
+        if dtype == 'float16':
+            return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        return np.frombuffer(blob, dtype=np.float32)
+
+    def _row_from_chunk(self, chunk: Dict) -> tuple:
+        source_file = chunk.get('source_file', '')
+        blob, scale = self._encode_embedding(chunk['embedding'])
+        return (
+            chunk['chunk_id'],
+            source_file,
+            os.path.basename(source_file),
+            chunk['text'],
+            json.dumps(chunk.get('page_numbers', [])),
+            json.dumps(chunk.get('metadata', {}), ensure_ascii=False),
+            blob,
+            self.embedding_dtype,
+            scale,
+        )
+
+    def add_chunks(self, chunks: Iterable[Dict], batch_size: int = 500) -> int:
+        """Insert (or replace) chunks, committing in batches"""
+        total = 0
+        batch = []
+        for chunk in chunks:
+            batch.append(self._row_from_chunk(chunk))
+            if len(batch) >= batch_size:
+                self._flush(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+            total += len(batch)
+        return total
+
+    def _flush(self, rows) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows)
+        self.conn.commit()
+
+    def iter_chunks(self) -> Iterator[Dict]:
+        """Stream all chunks as dicts in the embedded_chunks.json shape"""
+        cursor = self.conn.execute(
+            "SELECT chunk_id, source_file, text, page_numbers, metadata,"
+            " embedding, embedding_dtype, embedding_scale FROM chunks")
+        for (chunk_id, source_file, text, page_numbers, metadata,
+             embedding, dtype, scale) in cursor:
+            yield {
+                'chunk_id': chunk_id,
+                'source_file': source_file,
+                'text': text,
+                'page_numbers': json.loads(page_numbers) if page_numbers else [],
+                'metadata': json.loads(metadata) if metadata else {},
+                'embedding': self._decode_embedding(embedding, dtype, scale).tolist(),
+            }
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def count_by_source(self, target: str) -> int:
+        """Chunks whose source_file or basename matches target"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE source_file = ? OR filename = ?",
+            (target, os.path.basename(target)),
+        ).fetchone()[0]
+
+    def list_sources(self) -> list:
+        """Distinct source filenames, sorted"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT filename FROM chunks ORDER BY filename")]
+
+    def delete_by_source(self, target: str) -> int:
+        """Delete all chunks of one source file — a single indexed DELETE"""
+        cursor = self.conn.execute(
+            "DELETE FROM chunks WHERE source_file = ? OR filename = ?",
+            (target, os.path.basename(target)),
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def migrate_json(json_path: str, db_path: str = DEFAULT_DB_PATH,
+                 embedding_dtype: str = 'float32') -> int:
+    """Stream an embedded_chunks.json/JSONL export into chunks.db"""
+    store = ChunkStore(db_path, embedding_dtype=embedding_dtype)
+    try:
+        total = store.add_chunks(_iter_records(json_path))
+    finally:
+        store.close()
+    logger.info(f"Migrated {total} chunks from {json_path} to {db_path} "
+                f"({embedding_dtype})")
+    return total
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python chunk_store.py <embedded_chunks.json> "
+              "[chunks.db] [float32|float16|int8]")
+        sys.exit(1)
+    json_path = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DB_PATH
+    embedding_dtype = sys.argv[3] if len(sys.argv) > 3 else 'float32'
+    migrate_json(json_path, db_path, embedding_dtype=embedding_dtype)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,7 @@ import psutil
 import hashlib
 from pathlib import Path
 from typing import List, Dict
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from datetime import datetime
 import logging
 from tqdm import tqdm
@@ -28,7 +28,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentChunk:
     chunk_id: str
     text: str
@@ -40,7 +40,18 @@ class DocumentChunk:
     metadata: Dict
 
     def to_dict(self):
-        return asdict(self)
+        # Shallow dict literal: asdict() deep-copies the shared metadata
+        # dict for every chunk only for it to be serialized immediately
+        return {
+            'chunk_id': self.chunk_id,
+            'text': self.text,
+            'source_file': self.source_file,
+            'page_numbers': self.page_numbers,
+            'chunk_index': self.chunk_index,
+            'total_chunks': self.total_chunks,
+            'char_count': self.char_count,
+            'metadata': self.metadata,
+        }
 
 
 # ---------------------------------------------------------------------------
@@ -129,14 +140,13 @@ class PDFProcessor:
             if len(text) < self.min_chunk_size:
                 continue
 
-            # Extract page numbers from provenance
-            page_numbers = []
-            for item in chunk.meta.doc_items:
-                for prov in item.prov:
-                    pn = prov.page_no
-                    if pn not in page_numbers:
-                        page_numbers.append(pn)
-            page_numbers.sort()
+            # Extract page numbers from provenance — set membership is O(1)
+            # where the old list scan was O(pages) per provenance entry
+            page_numbers = sorted({
+                prov.page_no
+                for item in chunk.meta.doc_items
+                for prov in item.prov
+            })
 
             chunk_id = hashlib.md5(
                 f"{filename}_{chunk_index}".encode("utf-8", errors="replace")
@@ -1,434 +1,1070 @@
-"""
-Embedding Generation for RAG Pipeline
-Supports multiple embedding providers: OpenAI, Voyage AI, and Local Models
-"""
-
-import json
-import os
-from typing import List, Dict, Optional, Union
-from dataclasses import dataclass, asdict
-import logging
-from tqdm import tqdm
-import time
-import numpy as np
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-
-@dataclass
-class EmbeddedChunk:
-    """Chunk with its embedding vector"""
-    chunk_id: str
-    text: str
-    embedding: List[float]
-    source_file: str
-    page_numbers: List[int]
-    metadata: Dict
-
-    def to_dict(self):
-        data = asdict(self)
-        # Convert numpy array to list if needed
-        if isinstance(data['embedding'], np.ndarray):
-            data['embedding'] = data['embedding'].tolist()
-        return data
-
-
-class EmbeddingGenerator:
-    """
-    Generate embeddings using various providers
-    """
-
-    def __init__(
-        self,
-        provider: str = 'voyage',
-        model_name: Optional[str] = None,
-        api_key: Optional[str] = None,
-        batch_size: int = 32
-    ):
-        """
-        Initialize embedding generator
-
-        Args:
-            provider: 'openai', 'voyage', or 'sentence-transformers'
-            model_name: Specific model to use
-            api_key: API key for commercial providers
-            batch_size: Number of texts to embed at once
-        """
-        self.provider = provider.lower()
-        self.batch_size = batch_size
-        self.api_key = api_key or os.getenv('VOYAGE_API_KEY') or os.getenv('OPENAI_API_KEY')
-
-        # Initialize the appropriate embedding model
-        if self.provider == 'openai':
-            self._init_openai(model_name or 'text-embedding-3-large')
-        elif self.provider == 'voyage':
-            self._init_voyage(model_name or 'voyage-4-large')
-        else:  # sentence-transformers (local)
-            self._init_local(model_name or 'all-MiniLM-L6-v2')
-
-        logger.info(f"Initialized {self.provider} embeddings with model: {self.model_name}")
-
-    def _init_openai(self, model_name: str):
-        """Initialize OpenAI embeddings"""
-        try:
-            from openai import OpenAI
-            self.client = OpenAI(api_key=self.api_key)
-            self.model_name = model_name
-            self.embedding_dim = 3072 if '3-large' in model_name else 1536
-        except ImportError:
-            raise ImportError("Install OpenAI: pip install openai")
-
-    def _init_voyage(self, model_name: str):
-        """Initialize Voyage AI embeddings"""
-        import requests as _requests
-        self._voyage_session = _requests.Session()
-        self._voyage_session.headers.update({
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        })
-        self._voyage_url = 'https://api.voyageai.com/v1/embeddings'
-        self.model_name = model_name
-        dim_map = {
-            'voyage-4-large': 1024,
-            'voyage-4': 1024,
-            'voyage-4-lite': 512,
-            'voyage-3-large': 1024,
-            'voyage-3.5': 1024,
-            'voyage-3.5-lite': 512,
-        }
-        self.embedding_dim = dim_map.get(model_name, 1024)
-
-    def _init_local(self, model_name: str):
-        """Initialize local sentence-transformers model"""
-        try:
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(model_name)
-            self.model_name = model_name
-            self.embedding_dim = self.model.get_sentence_embedding_dimension()
-        except ImportError:
-            raise ImportError("Install sentence-transformers: pip install sentence-transformers")
-
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        """
-        Generate embeddings for a list of texts
-
-        Args:
-            texts: List of text strings to embed
-
-        Returns:
-            List of embedding vectors
-        """
-        if self.provider == 'openai':
-            return self._embed_openai(texts)
-        elif self.provider == 'voyage':
-            return self._embed_voyage(texts)
-        else:
-            return self._embed_local(texts)
-
-    def _embed_openai(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using OpenAI"""
-        embeddings = []
-
-        for i in range(0, len(texts), self.batch_size):
-            batch = texts[i:i + self.batch_size]
-            response = self.client.embeddings.create(
-                input=batch,
-                model=self.model_name
-            )
-            batch_embeddings = [item.embedding for item in response.data]
-            embeddings.extend(batch_embeddings)
-
-        return embeddings
-
-    def _embed_voyage(self, texts: List[str], input_type: str = "document") -> List[List[float]]:
-        """Generate embeddings using Voyage AI REST API with retry on rate limit"""
-        embeddings = []
-
-        for i in range(0, len(texts), self.batch_size):
-            batch = texts[i:i + self.batch_size]
-            payload = {
-                'model': self.model_name,
-                'input': batch,
-                'input_type': input_type
-            }
-
-            for attempt in range(5):
-                response = self._voyage_session.post(self._voyage_url, json=payload, timeout=60)
-                if response.status_code == 429:
-                    wait = 2 ** attempt
-                    logger.warning(f"Rate limited, waiting {wait}s (attempt {attempt + 1}/5)")
-                    time.sleep(wait)
-                    continue
-                response.raise_for_status()
-                data = response.json()
-                batch_embeddings = [item['embedding'] for item in data['data']]
-                embeddings.extend(batch_embeddings)
-                break
-            else:
-                raise Exception(f"Rate limited after 5 retries for batch starting at index {i}")
-
-        return embeddings
-
-    def _embed_local(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using local sentence-transformers"""
-        embeddings = self.model.encode(
-            texts,
-            batch_size=self.batch_size,
-            show_progress_bar=True,
-            convert_to_numpy=True
-        )
-        return embeddings.tolist()
-
-    def embed_query(self, query: str) -> List[float]:
-        """
-        Embed a single query text
-
-        Args:
-            query: Query string
-
-        Returns:
-            Embedding vector
-        """
-        if self.provider == 'voyage':
-            # Voyage AI has different input types for queries vs documents
-            return self._embed_voyage([query], input_type="query")[0]
-        else:
-            return self.embed_texts([query])[0]
-
-    def process_chunks_file(
-        self,
-        chunks_file: str,
-        output_file: str,
-        resume: bool = True
-    ) -> None:
-        """
-        Process chunks JSON file and add embeddings
-
-        Args:
-            chunks_file: Path to chunks.json from chunks_with_sentencesplitter
-            output_file: Path to save embedded chunks
-            resume: Resume from checkpoint if True
-        """
-        # Load chunks
-        logger.info(f"Loading chunks from {chunks_file}")
-        with open(chunks_file, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
-
-        logger.info(f"Loaded {len(chunks)} chunks")
-
-        # Check for checkpoint
-        checkpoint_file = f"{output_file}.checkpoint"
-        processed_ids = set()
-        embedded_chunks = []
-
-        if resume and os.path.exists(checkpoint_file):
-            logger.info("Loading checkpoint...")
-            with open(checkpoint_file, 'r') as f:
-                checkpoint = json.load(f)
-                processed_ids = set(checkpoint['processed_ids'])
-                logger.info(f"Resuming: {len(processed_ids)} chunks already processed")
-
-            # Load existing embeddings
-            if os.path.exists(output_file):
-                with open(output_file, 'r') as f:
-                    embedded_chunks = json.load(f)
-
-        # Filter unprocessed chunks
-        unprocessed_chunks = [c for c in chunks if c['chunk_id'] not in processed_ids]
-        logger.info(f"Processing {len(unprocessed_chunks)} remaining chunks")
-
-        # Process in batches
-        batch_texts = []
-        batch_chunks = []
-        batch_counter = [0]  # mutable counter passed to _process_batch
-
-        for chunk in tqdm(unprocessed_chunks, desc="Generating embeddings"):
-            batch_texts.append(chunk['text'])
-            batch_chunks.append(chunk)
-
-            # Process batch when full
-            if len(batch_texts) >= self.batch_size:
-                self._process_batch(
-                    batch_texts,
-                    batch_chunks,
-                    embedded_chunks,
-                    processed_ids,
-                    output_file,
-                    checkpoint_file,
-                    batch_counter
-                )
-                batch_texts = []
-                batch_chunks = []
-
-        # Process remaining batch
-        if batch_texts:
-            self._process_batch(
-                batch_texts,
-                batch_chunks,
-                embedded_chunks,
-                processed_ids,
-                output_file,
-                checkpoint_file,
-                batch_counter
-            )
-
-        # Final save
-        self._save_embeddings(output_file, embedded_chunks)
-        logger.info(f"Complete! Generated embeddings for {len(embedded_chunks)} chunks")
-
-        # Clean up checkpoint
-        if os.path.exists(checkpoint_file):
-            os.remove(checkpoint_file)
-
-    def _process_batch(
-        self,
-        batch_texts: List[str],
-        batch_chunks: List[Dict],
-        embedded_chunks: List[Dict],
-        processed_ids: set,
-        output_file: str,
-        checkpoint_file: str,
-        batch_counter: list  # [int] mutable counter
-    ):
-        """Process a batch of chunks with retry on network errors"""
-        import requests as _req
-
-        # Retry loop for network/connection errors
-        for attempt in range(5):
-            try:
-                embeddings = self.embed_texts(batch_texts)
-                break
-            except (_req.exceptions.ConnectionError,
-                    _req.exceptions.Timeout,
-                    _req.exceptions.ChunkedEncodingError) as e:
-                wait = 2 ** attempt
-                logger.warning(f"Network error (attempt {attempt+1}/5), retrying in {wait}s: {e}")
-                time.sleep(wait)
-        else:
-            raise Exception("Network error after 5 retries")
-
-        # Create embedded chunk objects
-        for chunk, embedding in zip(batch_chunks, embeddings):
-            embedded_chunk = EmbeddedChunk(
-                chunk_id=chunk['chunk_id'],
-                text=chunk['text'],
-                embedding=embedding,
-                source_file=chunk['source_file'],
-                page_numbers=chunk['page_numbers'],
-                metadata=chunk['metadata']
-            )
-            embedded_chunks.append(embedded_chunk.to_dict())
-            processed_ids.add(chunk['chunk_id'])
-
-        # Save checkpoint every batch (fast — only IDs)
-        self._save_checkpoint(checkpoint_file, processed_ids)
-
-        # Save full embeddings file every 100 batches (slow — large file)
-        batch_counter[0] += 1
-        if batch_counter[0] % 100 == 0:
-            self._save_embeddings(output_file, embedded_chunks)
-            logger.info(f"Saved embeddings at batch {batch_counter[0]} ({len(embedded_chunks):,} chunks)")
-
-    def _save_checkpoint(self, checkpoint_file: str, processed_ids: set):
-        """Save checkpoint"""
-        with open(checkpoint_file, 'w') as f:
-            json.dump({'processed_ids': list(processed_ids)}, f)
-
-    def _save_embeddings(self, output_file: str, embedded_chunks: List[Dict]):
-        """Save embeddings to file"""
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(embedded_chunks, f, indent=2, ensure_ascii=False)
-
-
-# Model recommendations
-EMBEDDING_MODELS = {
-    'openai': {
-        'text-embedding-3-large': {
-            'dim': 3072,
-            'cost_per_1M': 0.13,
-            'description': 'Best quality, higher cost'
-        },
-        'text-embedding-3-small': {
-            'dim': 1536,
-            'cost_per_1M': 0.02,
-            'description': 'Good quality, lower cost'
-        }
-    },
-    'voyage': {
-        'voyage-4-large': {
-            'dim': 1024,
-            'cost_per_1M': 0.18,
-            'description': 'Best quality for search/RAG'
-        },
-        'voyage-4': {
-            'dim': 1024,
-            'cost_per_1M': 0.10,
-            'description': 'Balanced quality/cost'
-        },
-        'voyage-4-lite': {
-            'dim': 512,
-            'cost_per_1M': 0.02,
-            'description': 'Fast and lightweight'
-        }
-    },
-    'sentence-transformers': {
-        'all-MiniLM-L6-v2': {
-            'dim': 384,
-            'cost_per_1M': 0.0,
-            'description': 'Fast, lightweight, FREE'
-        },
-        'all-mpnet-base-v2': {
-            'dim': 768,
-            'cost_per_1M': 0.0,
-            'description': 'Better quality, FREE'
-        },
-        'BAAI/bge-large-en-v1.5': {
-            'dim': 1024,
-            'cost_per_1M': 0.0,
-            'description': 'SOTA quality, FREE'
-        }
-    }
-}
-
-
-def print_model_recommendations():
-    """Print embedding model options"""
-    print("\n" + "="*70)
-    print("EMBEDDING MODEL RECOMMENDATIONS")
-    print("="*70)
-
-    for provider, models in EMBEDDING_MODELS.items():
-        print(f"\n{provider.upper()}:")
-        for model_name, info in models.items():
-            print(f"  • {model_name}")
-            print(f"    - Dimensions: {info['dim']}")
-            print(f"    - Cost per 1M tokens: ${info['cost_per_1M']}")
-            print(f"    - {info['description']}")
-
-
-def main():
-    """Example usage"""
-    print_model_recommendations()
-
-    # Using Voyage AI voyage-4-large (API key from .env)
-    generator = EmbeddingGenerator(
-        provider='voyage',
-        model_name='voyage-4-large',
-        batch_size=16
-    )
-
-    # Process chunks file
-    generator.process_chunks_file(
-        chunks_file='./chunks.json',
-        output_file='./embedded_chunks.json',
-        resume=True
-    )
-
-
-if __name__ == '__main__':
-    main()
+"""
+Embedding Generation for RAG Pipeline
+Supports multiple embedding providers: OpenAI, Voyage AI, and Local Models
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Union
+from dataclasses import dataclass, asdict
+import logging
+from tqdm import tqdm
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+try:
+    # orjson serializes float lists (and numpy arrays) in C — stdlib json
+    # pays per-element Python overhead, which dominates when vectors are
+    # most of the payload
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps_compact(obj) -> str:
+    """Serialize one record compactly (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _loads(data) -> Dict:
+    """Parse one JSON record (orjson when available)"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _attach_document_metadata(records):
+    """
+    Re-attach shared per-document metadata to chunk records.
+
+    The chunker writes one 'document' header record per PDF and strips the
+    (identical) metadata dict from each chunk line; rebuild the reference
+    here so downstream code still sees self-contained chunk records.
+    Records that already carry metadata pass through untouched.
+    """
+    doc_meta: Dict[str, Dict] = {}
+    for record in records:
+        if record.get('record_type') == 'document':
+            doc_meta[record.get('source_file')] = record.get('metadata', {})
+            continue
+        if 'metadata' not in record:
+            record['metadata'] = doc_meta.get(record.get('source_file'), {})
+        yield record
+
+
+def _read_chunk_records(path: str) -> List[Dict]:
+    """Read chunk records from a JSON array or JSONL file (sniffed)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            records = _loads(f.read())
+        else:
+            records = [_loads(line) for line in f if line.strip()]
+    return list(_attach_document_metadata(records))
+
+
+def _iter_chunk_records(path: str):
+    """
+    Stream chunk records one at a time from a JSON array (via ijson) or
+    a JSONL file, so the whole corpus never sits in memory at once.
+    """
+    yield from _attach_document_metadata(_iter_raw_records(path))
+
+
+def _iter_raw_records(path: str):
+    with open(path, 'rb') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == b'[':
+            try:
+                import ijson
+            except ImportError:
+                yield from json.load(f)
+                return
+            yield from ijson.items(f, 'item')
+        else:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+
+
+def _read_npy_records(base: str) -> List[Dict]:
+    """Rebuild chunk records from a .meta.jsonl + float16 .npy pair"""
+    vectors = np.load(f"{base}.npy").astype(np.float32)
+    records = []
+    with open(f"{base}.meta.jsonl", 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                chunk = _loads(line)
+                chunk['embedding'] = vectors[len(records)].tolist()
+                records.append(chunk)
+    if len(records) != vectors.shape[0]:
+        raise ValueError(
+            f"{base}.meta.jsonl has {len(records)} records but "
+            f"{base}.npy has {vectors.shape[0]} vectors"
+        )
+    return records
+
+
+@dataclass
+class EmbeddedChunk:
+    """Chunk with its embedding vector"""
+    chunk_id: str
+    text: str
+    embedding: List[float]
+    source_file: str
+    page_numbers: List[int]
+    metadata: Dict
+
+    def to_dict(self):
+        data = asdict(self)
+        # Convert numpy array to list if needed
+        if isinstance(data['embedding'], np.ndarray):
+            data['embedding'] = data['embedding'].tolist()
+        return data
+
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed embedding cache backed by SQLite.
+
+    Keyed by sha256(provider|model|text), so re-indexing a corpus only
+    pays the provider for chunks whose text actually changed. Vectors
+    are stored as float16 bytes to halve the on-disk footprint.
+    """
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> bytes:
+        return hashlib.sha256(f"{provider}|{model}|{text}".encode()).digest()
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[List[float]]]:
+        """Look up keys in order; None where the cache has no entry"""
+        found = {}
+        # SQLite caps bound parameters per statement — query in slices
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            placeholders = ','.join('?' * len(part))
+            rows = self.conn.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})",
+                part
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, np.float16).astype(np.float32).tolist()
+        return [found.get(k) for k in keys]
+
+    def put_many(self, items: List[tuple]) -> None:
+        """Store (key, vector) pairs, replacing existing entries"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+            [(key, np.asarray(vec, np.float16).tobytes()) for key, vec in items]
+        )
+        self.conn.commit()
+
+
+class EmbeddingGenerator:
+    """
+    Generate embeddings using various providers
+    """
+
+    def __init__(
+        self,
+        provider: str = 'voyage',
+        model_name: Optional[str] = None,
+        api_key: Optional[str] = None,
+        batch_size: int = 32,
+        max_concurrent: int = 8,
+        cache_path: Optional[str] = None,
+        async_batch: bool = False,
+        max_batch_tokens: int = 120_000
+    ):
+        """
+        Initialize embedding generator
+
+        Args:
+            provider: 'openai', 'voyage', 'ollama', or 'sentence-transformers'
+            model_name: Specific model to use
+            api_key: API key for commercial providers
+            batch_size: Number of texts to embed at once
+            max_concurrent: Batches kept in flight at once for API
+                providers (1 = strictly sequential)
+            cache_path: Optional SQLite file for a content-hash embedding
+                cache — unchanged texts are served from disk instead of
+                re-calling the provider
+            max_batch_tokens: Token budget per Voyage request — batches
+                are packed up to this estimate instead of a fixed count,
+                so long chunks don't overflow the API ceiling and short
+                ones don't underfill requests
+            async_batch: Route large offline jobs (>500 chunks in
+                process_chunks_file) through Voyage's batch endpoint —
+                half the cost, much higher TPM ceiling, but minutes to
+                hours of provider queueing
+        """
+        self.provider = provider.lower()
+        self.batch_size = batch_size
+        self.max_concurrent = max_concurrent
+        self.async_batch = async_batch
+        self.max_batch_tokens = max_batch_tokens
+        self._cache = EmbeddingCache(cache_path) if cache_path else None
+        # Bounded LRU for repeated exact queries — a hit skips the
+        # provider round-trip entirely
+        self._query_cache: OrderedDict = OrderedDict()
+        self._query_cache_size = 10_000
+        self._query_cache_lock = threading.Lock()
+        self.api_key = api_key or os.getenv('VOYAGE_API_KEY') or os.getenv('OPENAI_API_KEY')
+
+        # Initialize the appropriate embedding model
+        if self.provider == 'openai':
+            self._init_openai(model_name or 'text-embedding-3-large')
+        elif self.provider == 'voyage':
+            self._init_voyage(model_name or 'voyage-4-large')
+        elif self.provider == 'ollama':
+            self._init_ollama(model_name or 'nomic-embed-text')
+        else:  # sentence-transformers (local)
+            self._init_local(model_name or 'all-MiniLM-L6-v2')
+
+        logger.info(f"Initialized {self.provider} embeddings with model: {self.model_name}")
+
+    def _init_openai(self, model_name: str):
+        """Initialize OpenAI embeddings"""
+        try:
+            from openai import OpenAI
+            self.client = OpenAI(api_key=self.api_key)
+            self.model_name = model_name
+            self.embedding_dim = 3072 if '3-large' in model_name else 1536
+        except ImportError:
+            raise ImportError("Install OpenAI: pip install openai")
+
+    def _init_voyage(self, model_name: str):
+        """Initialize Voyage AI embeddings"""
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        try:
+            # HTTP/2 multiplexes requests over one TLS connection and
+            # keep-alive avoids per-request handshakes
+            import httpx
+            self._voyage_session = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+                timeout=60.0,
+                headers=headers
+            )
+        except ImportError:
+            import requests as _requests
+            self._voyage_session = _requests.Session()
+            self._voyage_session.headers.update(headers)
+        self._voyage_url = 'https://api.voyageai.com/v1/embeddings'
+        self.model_name = model_name
+        dim_map = {
+            'voyage-4-large': 1024,
+            'voyage-4': 1024,
+            'voyage-4-lite': 512,
+            'voyage-3-large': 1024,
+            'voyage-3.5': 1024,
+            'voyage-3.5-lite': 512,
+        }
+        self.embedding_dim = dim_map.get(model_name, 1024)
+
+    def _init_ollama(self, model_name: str):
+        """Initialize Ollama embeddings (local server)"""
+        import requests as _requests
+        self._ollama_session = _requests.Session()
+        base_url = os.getenv('OLLAMA_URL', 'http://localhost:11434').rstrip('/')
+        # Batched /api/embed takes a list of inputs per call; the older
+        # /api/embeddings endpoint embeds one text per HTTP round-trip
+        self._ollama_url = f"{base_url}/api/embed"
+        # Batch size is hardware-dependent (32 is sane for CPU/MPS, 128
+        # for CUDA) — overridable via env, clamped to a sensible range
+        try:
+            env_batch = int(os.getenv('OLLAMA_EMBED_BATCH', '0'))
+        except ValueError:
+            env_batch = 0
+        if env_batch:
+            self.batch_size = max(1, min(env_batch, 512))
+        self.model_name = model_name
+        self.embedding_dim = None  # learned from the first response
+
+    def _init_local(self, model_name: str):
+        """Initialize local sentence-transformers model"""
+        try:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model_name)
+            self.model_name = model_name
+            self.embedding_dim = self.model.get_sentence_embedding_dimension()
+        except ImportError:
+            raise ImportError("Install sentence-transformers: pip install sentence-transformers")
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a list of texts
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        if self._cache is None:
+            return self._embed_uncached(texts)
+
+        # Serve unchanged texts from the cache, embed only the misses
+        keys = [EmbeddingCache.make_key(self.provider, self.model_name, t)
+                for t in texts]
+        embeddings = self._cache.get_many(keys)
+        miss_idx = [i for i, vec in enumerate(embeddings) if vec is None]
+
+        if miss_idx:
+            new_vectors = self._embed_uncached([texts[i] for i in miss_idx])
+            self._cache.put_many(
+                [(keys[i], vec) for i, vec in zip(miss_idx, new_vectors)]
+            )
+            for i, vec in zip(miss_idx, new_vectors):
+                embeddings[i] = vec
+
+        hits = len(texts) - len(miss_idx)
+        if hits:
+            logger.info(f"Embedding cache: {hits}/{len(texts)} served from cache")
+        return embeddings
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Dispatch to the configured provider, bypassing the cache"""
+        if self.provider == 'openai':
+            return self._embed_openai(texts)
+        elif self.provider == 'voyage':
+            return self._embed_voyage(texts)
+        elif self.provider == 'ollama':
+            return self._embed_ollama(texts)
+        else:
+            return self._embed_local(texts)
+
+    def _embed_openai(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings using OpenAI"""
+        embeddings = []
+
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            response = self.client.embeddings.create(
+                input=batch,
+                model=self.model_name
+            )
+            batch_embeddings = [item.embedding for item in response.data]
+            embeddings.extend(batch_embeddings)
+
+        return embeddings
+
+    def _embed_ollama(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings via Ollama's batched /api/embed endpoint"""
+        batches = [texts[i:i + self.batch_size]
+                   for i in range(0, len(texts), self.batch_size)]
+
+        # Each batch is a full HTTP round-trip; keeping several in flight
+        # overlaps the latency, the same way the Voyage path does
+        if len(batches) > 1 and self.max_concurrent > 1:
+            try:
+                batch_results = asyncio.run(self._embed_ollama_async(batches))
+            except ImportError:
+                logger.warning("httpx not installed — embedding Ollama batches sequentially")
+            else:
+                embeddings = [vec for vectors in batch_results for vec in vectors]
+                if self.embedding_dim is None and embeddings:
+                    self.embedding_dim = len(embeddings[0])
+                return embeddings
+
+        embeddings: List[List[float]] = []
+        for batch in batches:
+            response = self._ollama_session.post(
+                self._ollama_url,
+                json={"model": self.model_name, "input": batch},
+                timeout=60.0,
+            )
+            response.raise_for_status()
+            vectors = response.json()["embeddings"]
+            if self.embedding_dim is None and vectors:
+                self.embedding_dim = len(vectors[0])
+            embeddings.extend(vectors)
+
+        return embeddings
+
+    async def _embed_ollama_async(self, batches: List[List[str]]) -> List[List[List[float]]]:
+        """
+        Submit batches concurrently under a bounded semaphore.
+
+        Results land in slot-indexed positions so order is preserved, and
+        each start gets a little random jitter to avoid a thundering herd
+        against the local server.
+        """
+        import httpx  # ImportError falls back to the sequential loop
+        import random
+
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            async def run_batch(slot: int, batch: List[str]):
+                async with semaphore:
+                    await asyncio.sleep(random.uniform(0, 0.1))
+                    for attempt in range(3):
+                        response = await client.post(
+                            self._ollama_url,
+                            json={"model": self.model_name, "input": batch},
+                        )
+                        if response.status_code in (429, 503):
+                            wait = float(response.headers.get('Retry-After', 2 ** attempt))
+                            logger.warning(f"Ollama busy, retrying batch {slot} in {wait:.1f}s...")
+                            await asyncio.sleep(wait)
+                            continue
+                        response.raise_for_status()
+                        results[slot] = response.json()["embeddings"]
+                        return
+                    raise Exception(f"Ollama still busy after 3 retries for batch {slot}")
+
+            await asyncio.gather(*(run_batch(i, b) for i, b in enumerate(batches)))
+
+        return results
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token estimate (the ~4 chars/token ratio Voyage documents)"""
+        return max(1, len(text) // 4)
+
+    def _pack_batches(self, texts: List[str]) -> List[List[str]]:
+        """
+        Greedily pack texts into batches under the per-request token
+        budget (and the API's 1000-text cap), instead of a fixed count.
+        """
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = self._estimate_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens
+                          or len(batch) >= 1000):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _embed_voyage(self, texts: List[str], input_type: str = "document") -> List[List[float]]:
+        """Generate embeddings using Voyage AI REST API with retry on rate limit"""
+        batches = self._pack_batches(texts)
+
+        # Multi-batch calls are latency-bound on HTTP round trips — fire
+        # them concurrently when there is more than one batch
+        if len(batches) > 1 and self.max_concurrent > 1:
+            try:
+                return asyncio.run(self._embed_voyage_async(batches, input_type))
+            except ImportError:
+                logger.warning("httpx not installed — embedding batches sequentially")
+
+        embeddings = []
+
+        for i, batch in enumerate(batches):
+            payload = {
+                'model': self.model_name,
+                'input': batch,
+                'input_type': input_type
+            }
+
+            for attempt in range(5):
+                response = self._voyage_session.post(self._voyage_url, json=payload, timeout=60)
+                if response.status_code == 429:
+                    wait = 2 ** attempt
+                    logger.warning(f"Rate limited, waiting {wait}s (attempt {attempt + 1}/5)")
+                    time.sleep(wait)
+                    continue
+                response.raise_for_status()
+                data = response.json()
+                batch_embeddings = [item['embedding'] for item in data['data']]
+                embeddings.extend(batch_embeddings)
+                break
+            else:
+                raise Exception(f"Rate limited after 5 retries for batch starting at index {i}")
+
+        return embeddings
+
+    async def _embed_voyage_async(
+        self,
+        batches: List[List[str]],
+        input_type: str = "document"
+    ) -> List[List[float]]:
+        """
+        Embed batches concurrently with httpx.
+
+        Up to max_concurrent POSTs stay in flight under a semaphore and
+        HTTP/2 multiplexes them over a single TLS connection, so wall
+        time is dominated by the slowest batch instead of the sum of all
+        round trips. Results are reassembled in input order; each batch
+        keeps the same 5-attempt exponential backoff on 429.
+        """
+        import httpx
+
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        sem = asyncio.Semaphore(self.max_concurrent)
+
+        async def _post(slot: int, batch: List[str]):
+            payload = {
+                'model': self.model_name,
+                'input': batch,
+                'input_type': input_type
+            }
+            async with sem:
+                for attempt in range(5):
+                    response = await session.post(self._voyage_url, json=payload)
+                    if response.status_code == 429:
+                        wait = 2 ** attempt
+                        logger.warning(f"Rate limited, waiting {wait}s (attempt {attempt + 1}/5)")
+                        await asyncio.sleep(wait)
+                        continue
+                    response.raise_for_status()
+                    data = response.json()
+                    results[slot] = [item['embedding'] for item in data['data']]
+                    return
+                raise Exception(f"Rate limited after 5 retries for batch {slot}")
+
+        async with httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+            timeout=60.0,
+            headers={
+                'Authorization': f'Bearer {self.api_key}',
+                'Content-Type': 'application/json'
+            }
+        ) as session:
+            await asyncio.gather(*(
+                _post(slot, batch) for slot, batch in enumerate(batches)
+            ))
+
+        embeddings: List[List[float]] = []
+        for batch_embeddings in results:
+            embeddings.extend(batch_embeddings)
+        return embeddings
+
+    def _embed_voyage_async_batch(
+        self,
+        texts: List[str],
+        poll_interval: int = 30,
+        max_wait: int = 24 * 3600
+    ) -> List[List[float]]:
+        """
+        Embed through Voyage's asynchronous batch endpoint.
+
+        Uploads a JSONL manifest, submits a batch job and polls until it
+        completes. Batch jobs cost half the sync price and are not
+        subject to per-minute rate limits, at the price of provider-side
+        queueing — only worth it for large offline indexing runs.
+        """
+        base_url = 'https://api.voyageai.com/v1'
+        auth = {'Authorization': f'Bearer {self.api_key}'}
+
+        # Upload the request manifest (multipart — not the JSON session)
+        import requests as _req
+        manifest = '\n'.join(
+            json.dumps({
+                'custom_id': str(i),
+                'body': {
+                    'model': self.model_name,
+                    'input': [text],
+                    'input_type': 'document'
+                }
+            })
+            for i, text in enumerate(texts)
+        )
+        response = _req.post(
+            f"{base_url}/files",
+            headers=auth,
+            files={'file': ('batch_input.jsonl', manifest.encode('utf-8'))},
+            data={'purpose': 'batch'},
+            timeout=300
+        )
+        response.raise_for_status()
+        input_file_id = response.json()['id']
+
+        # Submit the batch job
+        response = self._voyage_session.post(
+            f"{base_url}/batches",
+            json={
+                'input_file_id': input_file_id,
+                'endpoint': '/v1/embeddings',
+                'completion_window': '24h'
+            },
+            timeout=60
+        )
+        response.raise_for_status()
+        batch_id = response.json()['id']
+        logger.info(f"Submitted batch {batch_id} ({len(texts)} texts), polling every {poll_interval}s")
+
+        # Poll until the provider finishes
+        deadline = time.time() + max_wait
+        while True:
+            response = self._voyage_session.get(f"{base_url}/batches/{batch_id}", timeout=60)
+            response.raise_for_status()
+            batch = response.json()
+            status = batch.get('status')
+            if status == 'completed':
+                break
+            if status in ('failed', 'expired', 'cancelled'):
+                raise Exception(f"Batch {batch_id} ended with status '{status}'")
+            if time.time() > deadline:
+                raise Exception(f"Batch {batch_id} still '{status}' after {max_wait}s")
+            time.sleep(poll_interval)
+
+        # Download results and reassemble in input order by custom_id
+        response = self._voyage_session.get(
+            f"{base_url}/files/{batch['output_file_id']}/content", timeout=300
+        )
+        response.raise_for_status()
+
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            idx = int(record['custom_id'])
+            embeddings[idx] = record['response']['body']['data'][0]['embedding']
+
+        missing = sum(1 for e in embeddings if e is None)
+        if missing:
+            raise Exception(f"Batch {batch_id} returned no embedding for {missing} texts")
+        return embeddings
+
+    def _embed_local(
+        self,
+        texts: List[str],
+        smart_batching: bool = True
+    ) -> List[List[float]]:
+        """
+        Generate embeddings using local sentence-transformers.
+
+        With smart_batching, texts are encoded in length order so each
+        mini-batch pads to its own longest member instead of chunk order
+        mixing short and long texts — padding tokens dominate encoder
+        FLOPs, so this is a large throughput win at identical output.
+        """
+        if smart_batching and len(texts) > self.batch_size:
+            order = np.argsort([len(t) for t in texts], kind='stable')
+            embeddings = self.model.encode(
+                [texts[i] for i in order],
+                batch_size=self.batch_size,
+                show_progress_bar=True,
+                convert_to_numpy=True
+            )
+            # Inverse permutation restores the caller's order
+            return embeddings[np.argsort(order)].tolist()
+
+        embeddings = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            show_progress_bar=True,
+            convert_to_numpy=True
+        )
+        return embeddings.tolist()
+
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a single query text
+
+        Repeated exact queries are served from a thread-safe in-process
+        LRU — and from the SQLite cache when one is configured — instead
+        of paying the provider round-trip again.
+
+        Args:
+            query: Query string
+
+        Returns:
+            Embedding vector
+        """
+        # "query|" prefix keeps query-type vectors separate from the
+        # document-type entries embed_texts stores under the same text
+        key = EmbeddingCache.make_key(self.provider, self.model_name, f"query|{query}")
+        with self._query_cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+                return cached
+
+        embedding = None
+        if self._cache is not None:
+            embedding = self._cache.get_many([key])[0]
+
+        if embedding is None:
+            if self.provider == 'voyage':
+                # Voyage AI has different input types for queries vs documents
+                embedding = self._embed_voyage([query], input_type="query")[0]
+            else:
+                embedding = self.embed_texts([query])[0]
+            if self._cache is not None:
+                self._cache.put_many([(key, embedding)])
+
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            self._query_cache.move_to_end(key)
+            while len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def process_chunks_file(
+        self,
+        chunks_file: str,
+        output_file: str,
+        resume: bool = True,
+        npy_sidecar: bool = False
+    ) -> None:
+        """
+        Process chunks JSON file and add embeddings
+
+        Args:
+            chunks_file: Path to chunks.json from chunks_with_sentencesplitter
+            output_file: Path to save embedded chunks
+            resume: Resume from checkpoint if True
+            npy_sidecar: Persist vectors as a float16 .npy matrix plus a
+                metadata JSONL instead of JSON-encoded floats (~10x
+                smaller files, far faster save/load)
+        """
+        # Stream chunks — time-to-first-batch is a file-header read, not
+        # a full parse, and peak memory stays flat
+        logger.info(f"Streaming chunks from {chunks_file}")
+        chunk_iter = _iter_chunk_records(chunks_file)
+
+        # Resume from the output itself — the records already written are
+        # the progress marker, no separate checkpoint file needed. Only
+        # the chunk IDs are kept in memory; the records stay on disk.
+        processed_ids = set()
+        base = os.path.splitext(output_file)[0]
+
+        if resume and os.path.exists(output_file):
+            with open(output_file, 'r', encoding='utf-8') as f:
+                legacy_array = f.read(1) == '['
+            if legacy_array:
+                # One-time conversion of a pre-JSONL array file
+                records = _read_chunk_records(output_file)
+                self._save_embeddings(output_file, records)
+                processed_ids = {c['chunk_id'] for c in records}
+                del records
+            else:
+                for record in _iter_chunk_records(output_file):
+                    processed_ids.add(record['chunk_id'])
+        elif resume and os.path.exists(f"{base}.npy") and os.path.exists(f"{base}.meta.jsonl"):
+            records = _read_npy_records(base)
+            self._save_embeddings(output_file, records)
+            processed_ids = {c['chunk_id'] for c in records}
+            del records
+
+        if processed_ids:
+            logger.info(f"Resuming: {len(processed_ids)} chunks already processed")
+        else:
+            # Fresh run — truncate any stale output so appends start clean
+            open(output_file, 'w', encoding='utf-8').close()
+
+        # Filter unprocessed chunks lazily — the async-batch path is the
+        # only consumer that needs the whole list (for its manifest)
+        if self.async_batch and self.provider == 'voyage':
+            unprocessed_chunks = [c for c in chunk_iter
+                                  if c['chunk_id'] not in processed_ids]
+            logger.info(f"Processing {len(unprocessed_chunks)} remaining chunks")
+        else:
+            unprocessed_chunks = (c for c in chunk_iter
+                                  if c['chunk_id'] not in processed_ids)
+
+        # Large offline jobs: one batch-endpoint submission instead of
+        # client-paced sync calls (half the cost, no RPM throttling)
+        if (self.async_batch and self.provider == 'voyage'
+                and len(unprocessed_chunks) > 500):
+            embeddings = self._embed_voyage_async_batch(
+                [c['text'] for c in unprocessed_chunks]
+            )
+            # Same one-shot L2 normalization as the batch path
+            arr = np.asarray(embeddings, dtype=np.float32)
+            arr /= np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12
+            embeddings = arr.tolist()
+            with open(output_file, 'a', encoding='utf-8') as f:
+                for chunk, embedding in zip(unprocessed_chunks, embeddings):
+                    f.write(_dumps_compact({
+                        'chunk_id': chunk['chunk_id'],
+                        'text': chunk['text'],
+                        'embedding': embedding,
+                        'source_file': chunk['source_file'],
+                        'page_numbers': chunk['page_numbers'],
+                        'metadata': chunk['metadata'],
+                    }))
+                    f.write('\n')
+                    processed_ids.add(chunk['chunk_id'])
+            if npy_sidecar:
+                self._export_npy_sidecar(output_file, _read_chunk_records(output_file))
+                os.remove(output_file)
+            logger.info(f"Complete! Generated embeddings for {len(processed_ids)} chunks")
+            return
+
+        # Feed embed_texts slices big enough for the token-budget packer
+        # to cut several full requests and keep max_concurrent of them in
+        # flight — flushing every batch_size texts would hand it one
+        # under-filled request at a time and serialize the whole run.
+        # Each slice still appends to the JSONL output and is dropped, so
+        # peak memory is one slice.
+        in_flight = max(1, self.max_concurrent)
+        slice_max_texts = 1000 * in_flight  # 1000 = Voyage per-request cap
+        slice_max_tokens = self.max_batch_tokens * in_flight
+
+        batch_texts = []
+        batch_chunks = []
+        slice_tokens = 0
+
+        for chunk in tqdm(unprocessed_chunks, desc="Generating embeddings"):
+            batch_texts.append(chunk['text'])
+            batch_chunks.append(chunk)
+            slice_tokens += self._estimate_tokens(chunk['text'])
+
+            # Process the slice once either budget is filled
+            if (len(batch_texts) >= slice_max_texts
+                    or slice_tokens >= slice_max_tokens):
+                self._process_batch(
+                    batch_texts,
+                    batch_chunks,
+                    processed_ids,
+                    output_file
+                )
+                batch_texts = []
+                batch_chunks = []
+                slice_tokens = 0
+
+        # Process remaining batch
+        if batch_texts:
+            self._process_batch(
+                batch_texts,
+                batch_chunks,
+                processed_ids,
+                output_file
+            )
+
+        # The JSONL output is already complete from the per-batch appends;
+        # in npy mode, convert it to the float16 pair and drop the log
+        if npy_sidecar:
+            self._export_npy_sidecar(output_file, _read_chunk_records(output_file))
+            os.remove(output_file)
+        logger.info(f"Complete! Generated embeddings for {len(processed_ids)} chunks")
+
+        # Clean up checkpoint files left behind by older versions
+        stale_checkpoint = f"{output_file}.checkpoint"
+        if os.path.exists(stale_checkpoint):
+            os.remove(stale_checkpoint)
+
+    def _process_batch(
+        self,
+        batch_texts: List[str],
+        batch_chunks: List[Dict],
+        processed_ids: set,
+        output_file: str
+    ):
+        """Process a batch of chunks with retry on network errors"""
+        import requests as _req
+
+        # The Voyage session may be httpx (HTTP/2) or requests (fallback),
+        # so the retry must cover the transport errors of both stacks
+        network_errors: tuple = (
+            _req.exceptions.ConnectionError,
+            _req.exceptions.Timeout,
+            _req.exceptions.ChunkedEncodingError,
+        )
+        try:
+            import httpx as _httpx
+            network_errors += (_httpx.TransportError,)
+        except ImportError:
+            pass
+
+        # Retry loop for network/connection errors
+        for attempt in range(5):
+            try:
+                embeddings = self.embed_texts(batch_texts)
+                break
+            except network_errors as e:
+                wait = 2 ** attempt
+                logger.warning(f"Network error (attempt {attempt+1}/5), retrying in {wait}s: {e}")
+                time.sleep(wait)
+        else:
+            raise Exception("Network error after 5 retries")
+
+        # Create embedded chunk objects and append only this batch to the
+        # output — the old full rewrite made batch N pay for the N-1
+        # batches before it (O(N^2) bytes written over a run)
+        # L2-normalize the whole batch in one BLAS call — cosine search
+        # downstream then reduces to a dot product, and the per-query
+        # normalization cost is paid once here instead
+        arr = np.asarray(embeddings, dtype=np.float32)
+        arr /= np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12
+        embeddings = arr
+
+        # Records are built as plain dicts here: the EmbeddedChunk/asdict
+        # round trip deep-copies every nested structure per chunk, which
+        # is pure overhead on this path (the dataclass stays as the
+        # external API type).
+        batch_records = []
+        for chunk, embedding in zip(batch_chunks, embeddings):
+            batch_records.append({
+                'chunk_id': chunk['chunk_id'],
+                'text': chunk['text'],
+                'embedding': embedding.tolist() if isinstance(embedding, np.ndarray) else embedding,
+                'source_file': chunk['source_file'],
+                'page_numbers': chunk['page_numbers'],
+                'metadata': chunk['metadata'],
+            })
+            processed_ids.add(chunk['chunk_id'])
+
+        # Flush and forget — the JSONL file is the record of progress,
+        # so nothing from this batch stays in memory
+        with open(output_file, 'a', encoding='utf-8') as f:
+            for record in batch_records:
+                f.write(_dumps_compact(record))
+                f.write('\n')
+
+    def _save_embeddings(self, output_file: str, embedded_chunks: List[Dict]):
+        """
+        Save embeddings as JSONL (one record per line).
+
+        Serializing one record at a time keeps peak memory flat — the old
+        indent=2 array dump built the entire multi-GB string in memory.
+        Readers sniff the first character, so legacy array files still load.
+        """
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for chunk in embedded_chunks:
+                f.write(_dumps_compact(chunk))
+                f.write('\n')
+
+    def _export_npy_sidecar(self, output_file: str, embedded_chunks: List[Dict]):
+        """
+        Export vectors as a float16 (N, D) .npy matrix plus a metadata
+        JSONL without the embeddings.
+
+        A JSON-encoded float32 costs ~12 bytes of text; binary float16
+        costs 2. Downstream use is cosine similarity on normalized
+        vectors, so fp16 is well within precision budget. VectorDatabase
+        loads this pair when given the .meta.jsonl path.
+        """
+        base = os.path.splitext(output_file)[0]
+        vectors = np.array(
+            [chunk['embedding'] for chunk in embedded_chunks], dtype=np.float16
+        )
+        np.save(f"{base}.npy", vectors)
+        with open(f"{base}.meta.jsonl", 'w', encoding='utf-8') as f:
+            for chunk in embedded_chunks:
+                meta = {k: v for k, v in chunk.items() if k != 'embedding'}
+                f.write(_dumps_compact(meta))
+                f.write('\n')
+        logger.info(f"Exported {base}.npy ({vectors.shape}) + {base}.meta.jsonl")
+
+
+# Model recommendations
+EMBEDDING_MODELS = {
+    'openai': {
+        'text-embedding-3-large': {
+            'dim': 3072,
+            'cost_per_1M': 0.13,
+            'description': 'Best quality, higher cost'
+        },
+        'text-embedding-3-small': {
+            'dim': 1536,
+            'cost_per_1M': 0.02,
+            'description': 'Good quality, lower cost'
+        }
+    },
+    'voyage': {
+        'voyage-4-large': {
+            'dim': 1024,
+            'cost_per_1M': 0.18,
+            'description': 'Best quality for search/RAG'
+        },
+        'voyage-4': {
+            'dim': 1024,
+            'cost_per_1M': 0.10,
+            'description': 'Balanced quality/cost'
+        },
+        'voyage-4-lite': {
+            'dim': 512,
+            'cost_per_1M': 0.02,
+            'description': 'Fast and lightweight'
+        }
+    },
+    'sentence-transformers': {
+        'all-MiniLM-L6-v2': {
+            'dim': 384,
+            'cost_per_1M': 0.0,
+            'description': 'Fast, lightweight, FREE'
+        },
+        'all-mpnet-base-v2': {
+            'dim': 768,
+            'cost_per_1M': 0.0,
+            'description': 'Better quality, FREE'
+        },
+        'BAAI/bge-large-en-v1.5': {
+            'dim': 1024,
+            'cost_per_1M': 0.0,
+            'description': 'SOTA quality, FREE'
+        }
+    }
+}
+
+
+def print_model_recommendations():
+    """Print embedding model options"""
+    print("\n" + "="*70)
+    print("EMBEDDING MODEL RECOMMENDATIONS")
+    print("="*70)
+
+    for provider, models in EMBEDDING_MODELS.items():
+        print(f"\n{provider.upper()}:")
+        for model_name, info in models.items():
+            print(f"  • {model_name}")
+            print(f"    - Dimensions: {info['dim']}")
+            print(f"    - Cost per 1M tokens: ${info['cost_per_1M']}")
+            print(f"    - {info['description']}")
+
+
+def main():
+    """Example usage"""
+    print_model_recommendations()
+
+    # Using Voyage AI voyage-4-large (API key from .env)
+    generator = EmbeddingGenerator(
+        provider='voyage',
+        model_name='voyage-4-large',
+        batch_size=16
+    )
+
+    # Process chunks file
+    generator.process_chunks_file(
+        chunks_file='./chunks.json',
+        output_file='./embedded_chunks.json',
+        resume=True
+    )
+
+
+if __name__ == '__main__':
+    main()
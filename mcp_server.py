@@ -3,10 +3,15 @@ MCP Server for RAG Pipeline
 Exposes vector search over PDF knowledge base as tools for Claude Desktop.
 """
 
+import io
+import json
 import sys
 import os
 import logging
 import time
+from collections import Counter
+
+import numpy as np
 from dotenv import load_dotenv
 
 logging.basicConfig(
@@ -49,6 +54,14 @@ def _get_resources():
         from vector_database import VectorDatabase
         _logger.info("Loading embedder (voyage-4-large)...")
         _embedder = EmbeddingGenerator(provider="voyage", model_name="voyage-4-large")
+        # Prime the TCP/TLS connection so the first real query doesn't pay
+        # the handshake (and validate the API key while we're at it)
+        try:
+            t0 = time.monotonic()
+            _embedder.embed_query("warmup")
+            _logger.info(f"Voyage connection warmed up ({time.monotonic()-t0:.2f}s)")
+        except Exception as e:
+            _logger.warning(f"Voyage warmup failed (continuing): {e}")
         _logger.info("Loading ChromaDB (pdf_documents)...")
         _db = VectorDatabase(
             db_path=os.path.join(_PROJECT_DIR, "chroma_db"),
@@ -83,27 +96,41 @@ def search_documents(query: str, n_results: int = 5) -> str:
         _logger.info(f"search_documents: no results ({time.monotonic()-t0:.2f}s)")
         return "No results found."
 
-    parts: list[str] = []
-    for i, (doc, meta, dist) in enumerate(
+    # One growable buffer instead of a list of per-result f-strings —
+    # fewer intermediate allocations on large result sets
+    # One vectorized op instead of per-row Python float arithmetic
+    similarities = 1.0 - np.asarray(results["distances"][0])
+
+    buf = io.StringIO()
+    count = 0
+    for i, (doc, meta, sim) in enumerate(
         zip(
             results["documents"][0],
             results["metadatas"][0],
-            results["distances"][0],
+            similarities,
         ),
         1,
     ):
         source = meta.get("filename") or meta.get("source_file", "unknown")
         pages = meta.get("page_numbers", "")
-        similarity = 1 - dist
-        parts.append(
-            f"--- Result {i} (similarity {similarity:.3f}) ---\n"
-            f"Source: {source}  |  Pages: {pages}\n\n"
-            f"{doc}"
-        )
+        if i > 1:
+            buf.write("\n\n")
+        buf.write("--- Result " + str(i)
+                  + " (similarity " + format(sim, ".3f") + ") ---\n")
+        buf.write("Source: " + str(source) + "  |  Pages: " + str(pages) + "\n\n")
+        buf.write(doc)
+        count = i
 
     elapsed = time.monotonic() - t0
-    _logger.info(f"search_documents: {len(parts)} results ({elapsed:.2f}s)")
-    return "\n\n".join(parts)
+    _logger.info(f"search_documents: {count} results ({elapsed:.2f}s)")
+    return buf.getvalue()
+
+
+# list_sources aggregation cache — the full-collection metadata scan is
+# multi-second on large collections, so reuse the result while the TTL
+# holds or the chunk count is unchanged
+_sources_cache: dict = {"ts": 0.0, "count": -1, "text": None}
+_SOURCES_TTL = 60.0
 
 
 @mcp.tool()
@@ -115,32 +142,82 @@ def list_sources() -> str:
     _, db = _get_resources()
     collection = db.client.get_collection(db.collection_name)
 
+    if _sources_cache["text"] is not None:
+        if time.monotonic() - _sources_cache["ts"] < _SOURCES_TTL:
+            _logger.info("list_sources: served from cache (TTL)")
+            return _sources_cache["text"]
+        # TTL expired — count() is cheap; if nothing was added or removed,
+        # the aggregation is still valid
+        if collection.count() == _sources_cache["count"]:
+            _sources_cache["ts"] = time.monotonic()
+            _logger.info("list_sources: served from cache (count unchanged)")
+            return _sources_cache["text"]
+
+    # Persisted index survives restarts: the ingest side invalidates it
+    # on every load/delete, and the chunk count guards against drift
+    index_path = db.sources_index_path()
+    current_count = collection.count()
     sources: dict[str, int] = {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("count") == current_count:
+            sources = index["sources"]
+            _logger.info("list_sources: loaded persisted index")
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    if sources:
+        return _render_sources(sources, t0)
+
     batch_size = 5000
     offset = 0
+    counter: Counter = Counter()
 
     while True:
         batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
         if not batch["metadatas"]:
             break
-        for meta in batch["metadatas"]:
-            name = meta.get("filename") or meta.get("source_file", "unknown")
-            sources[name] = sources.get(name, 0) + 1
+        # Counter.update over a generator counts in C instead of a
+        # per-metadata Python dict-get/set
+        counter.update(
+            meta.get("filename") or meta.get("source_file", "unknown")
+            for meta in batch["metadatas"]
+        )
         if len(batch["metadatas"]) < batch_size:
             break
         offset += batch_size
 
-    elapsed = time.monotonic() - t0
+    sources = dict(counter)
 
     if not sources:
-        _logger.info(f"list_sources: empty ({elapsed:.2f}s)")
+        _logger.info(f"list_sources: empty ({time.monotonic()-t0:.2f}s)")
         return "No documents in the knowledge base."
 
-    _logger.info(f"list_sources: {len(sources)} docs, {sum(sources.values())} chunks ({elapsed:.2f}s)")
-    lines = [f"Knowledge base contains {sum(sources.values())} chunks from {len(sources)} document(s):\n"]
+    try:
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump({"count": current_count, "sources": sources}, f, ensure_ascii=False)
+    except OSError as e:
+        _logger.warning(f"list_sources: could not persist index: {e}")
+
+    return _render_sources(sources, t0)
+
+
+def _render_sources(sources: dict, t0: float) -> str:
+    """Format the per-source counts and refresh the in-process cache."""
+    total = sum(sources.values())
+    _logger.info(f"list_sources: {len(sources)} docs, {total} chunks ({time.monotonic()-t0:.2f}s)")
+    buf = io.StringIO()
+    buf.write("Knowledge base contains " + str(total) + " chunks from "
+              + str(len(sources)) + " document(s):\n")
     for name, count in sorted(sources.items()):
-        lines.append(f"  - {name}  ({count} chunks)")
-    return "\n".join(lines)
+        buf.write("\n  - " + name + "  (" + str(count) + " chunks)")
+    text = buf.getvalue()
+
+    _sources_cache["ts"] = time.monotonic()
+    _sources_cache["count"] = total
+    _sources_cache["text"] = text
+    return text
 
 
 if __name__ == "__main__":
@@ -0,0 +1,600 @@
+"""
+RAG Pipeline with Local LLM (Ollama)
+Combines ChromaDB vector search with a local Ollama model for full Q&A.
+
+Standalone script — the MCP server does not use Ollama. Retrieval shares
+the same embeddings and ChromaDB collection as the rest of the pipeline;
+generation runs locally through Ollama's /api/chat endpoint.
+
+Batch throughput: Ollama serves OLLAMA_NUM_PARALLEL requests in parallel
+(default 1). Raise it (and OLLAMA_MAX_LOADED_MODELS when switching models
+per request) so batch_query can actually overlap generation:
+
+    export OLLAMA_NUM_PARALLEL=4
+    export OLLAMA_MAX_LOADED_MODELS=1
+"""
+
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from embeddings_with_voyage import EmbeddingGenerator
+from vector_database import VectorDatabase
+
+# httpx powers the concurrent batch path; the single-question path works
+# without it
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# orjson parses Ollama responses and the cache sidecar in C; stdlib json
+# is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+DEFAULT_OLLAMA_MODEL = "qwen2.5:32b"
+
+# Keep this byte-identical across calls: Ollama reuses the KV cache for a
+# shared prompt prefix, so a constant system prompt means the prefill cost
+# of these tokens is paid once per model load, not per question. Anything
+# static (instructions, answer guidelines) belongs here, not in the
+# per-question user message.
+SYSTEM_PROMPT = (
+    "You are a helpful assistant answering questions about a collection of "
+    "PDF documents. Answer using ONLY the provided context. If the context "
+    "does not contain the answer, say so. Cite the source document names "
+    "you used."
+)
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings.
+
+    Paraphrased questions embed close together, so a cosine-similarity
+    lookup (one matrix-vector product over the cached vectors) can return
+    a stored answer without touching Chroma or paying seconds of LLM
+    inference. Entries past their TTL are pruned on lookup (so they can
+    never shadow a still-valid neighbor) and the least recently used one
+    is evicted past max_entries. Persisted as a float32 .npy matrix plus
+    a JSON sidecar so hits survive restarts; the sidecar rewrite is O(N),
+    so it is debounced to every save_every answers — a crash loses at
+    most that many.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.92,
+                 ttl: float = 24 * 3600, max_entries: int = 1000,
+                 save_every: int = 10):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self._unsaved = 0
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.entries: List[Dict] = []
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            vectors = np.load(f"{self.path}.npy")
+            with open(f"{self.path}.json", 'rb') as f:
+                entries = _loads(f.read())
+        except (FileNotFoundError, ValueError, OSError):
+            return
+        if vectors.ndim == 2 and vectors.shape[0] == len(entries):
+            self.vectors = vectors.astype(np.float32)
+            self.entries = entries
+            logger.info(f"Semantic cache loaded: {len(entries)} entries")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            np.save(f"{self.path}.npy", self.vectors)
+            with open(f"{self.path}.json", 'wb') as f:
+                f.write(_dumps(self.entries))
+        except OSError as e:
+            logger.warning(f"Could not persist semantic cache: {e}")
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec / (np.linalg.norm(vec) + 1e-12)
+
+    def _prune_expired(self) -> None:
+        """Drop entries past their TTL before scoring"""
+        now = time.time()
+        expired = [i for i, entry in enumerate(self.entries)
+                   if now - entry['ts'] > self.ttl]
+        if not expired:
+            return
+        self.vectors = np.delete(self.vectors, expired, axis=0)
+        for i in reversed(expired):
+            del self.entries[i]
+
+    def get(self, embedding) -> Optional[Dict]:
+        """Return the cached result for a semantically close query, or None"""
+        # Prune first: an expired entry at argmax must not shadow a
+        # still-valid neighbor above the threshold
+        self._prune_expired()
+        if not self.entries:
+            return None
+        query_vec = self._normalize(embedding)
+        scores = self.vectors @ query_vec  # one BLAS gemv over all entries
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        entry = self.entries[best]
+        entry['last_used'] = time.time()
+        return entry['result']
+
+    def put(self, embedding, result: Dict) -> None:
+        query_vec = self._normalize(embedding)[None, :]
+        if self.vectors.size == 0:
+            self.vectors = query_vec
+        else:
+            self.vectors = np.vstack([self.vectors, query_vec])
+        now = time.time()
+        self.entries.append({'result': result, 'ts': now, 'last_used': now})
+
+        if len(self.entries) > self.max_entries:
+            drop = min(range(len(self.entries)),
+                       key=lambda i: self.entries[i]['last_used'])
+            self.vectors = np.delete(self.vectors, drop, axis=0)
+            del self.entries[drop]
+
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self._save()
+            self._unsaved = 0
+
+
+class Reranker:
+    """
+    Cross-encoder reranking stage between retrieval and generation.
+
+    Bi-encoder retrieval is recall-oriented; the cross-encoder reads the
+    query and each candidate together and orders them far more precisely,
+    so fewer but better chunks go into the LLM context (fewer context
+    tokens also means less attention work per generated token). The model
+    loads lazily on first use and runs on GPU when available.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 batch_size: int = 32):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            logger.info(f"Loading reranker model: {self.model_name}")
+            self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def rerank(self, query: str, contexts: List[Dict], top_k: int) -> List[Dict]:
+        """Return the top_k contexts ordered by cross-encoder score"""
+        if len(contexts) <= top_k:
+            return contexts
+
+        model = self._get_model()
+        # One batched forward pass over all (query, candidate) pairs
+        scores = model.predict(
+            [(query, ctx['text']) for ctx in contexts],
+            batch_size=self.batch_size,
+        )
+        order = np.argsort(scores)[::-1][:top_k]
+
+        reranked = []
+        for i in order:
+            ctx = contexts[i]
+            ctx['rerank_score'] = float(scores[i])
+            reranked.append(ctx)
+        return reranked
+
+
+class RAGPipeline:
+    """
+    Retrieval-augmented Q&A over the PDF knowledge base.
+
+    retrieve() embeds the question and pulls the top chunks from ChromaDB;
+    query() feeds them to Ollama for the answer. batch_query() runs many
+    questions concurrently — generation is latency-bound (seconds per
+    answer on CPU), so overlapping in-flight requests cuts wall time up to
+    the server's OLLAMA_NUM_PARALLEL ceiling.
+    """
+
+    def __init__(
+        self,
+        vector_db_path: str = "./chroma_db",
+        collection_name: str = "pdf_documents",
+        embedding_provider: str = "voyage",
+        embedding_model: Optional[str] = None,
+        ollama_url: str = DEFAULT_OLLAMA_URL,
+        ollama_model: str = DEFAULT_OLLAMA_MODEL,
+        max_concurrent: int = 4,
+        request_timeout: float = 600.0,
+        ollama_keep_alive: str = "30m",
+        semantic_cache_path: Optional[str] = "./semantic_cache",
+        semantic_cache_threshold: float = 0.92,
+        use_rerank: bool = False,
+        rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        use_multi_query: bool = False,
+    ):
+        self.embedding_generator = EmbeddingGenerator(
+            provider=embedding_provider,
+            model_name=embedding_model,
+        )
+        self.vector_db = VectorDatabase(
+            db_path=vector_db_path,
+            collection_name=collection_name,
+        )
+        self.ollama_url = ollama_url.rstrip('/')
+        self.ollama_model = ollama_model
+        self.ollama_keep_alive = ollama_keep_alive
+        self.max_concurrent = max_concurrent
+        self.request_timeout = request_timeout
+        self.semantic_cache = SemanticCache(
+            path=semantic_cache_path,
+            threshold=semantic_cache_threshold,
+        ) if semantic_cache_path else None
+        self.reranker = Reranker(model_name=rerank_model) if use_rerank else None
+        self.use_multi_query = use_multi_query
+
+        # Keep-alive session towards Ollama: reuse one TCP connection per
+        # worker instead of a fresh handshake for every question
+        self.session = requests.Session()
+        self.session.mount(
+            "http://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+
+    def retrieve(self, question: str, n_results: int = 5) -> List[Dict]:
+        """Embed the question and return the top matching chunks"""
+        embedding = self.embedding_generator.embed_query(question)
+        return self._retrieve_by_embedding(question, embedding, n_results)
+
+    @staticmethod
+    def expand_query(question: str, n: int = 3) -> List[str]:
+        """
+        Template rewrites of the question for multi-query retrieval.
+
+        Paraphrases embed to nearby but not identical points, so their
+        top-k sets cover lexical shifts in the corpus that the original
+        phrasing misses. Deterministic templates keep the rewrites free
+        (no extra LLM call) and cacheable.
+        """
+        core = question.rstrip('?!. ')
+        rewrites = [
+            f"Information about {core}",
+            f"{core} — key facts and details",
+            f"What do the documents say about {core}?",
+        ]
+        return rewrites[:n]
+
+    def _retrieve_multi(self, question: str, embedding,
+                        n_results: int) -> List[Dict]:
+        """
+        Retrieve with the question plus its rewrites and merge the results.
+
+        Each variant's top-k is fetched concurrently (Chroma releases the
+        GIL during the HNSW query); duplicates are collapsed keeping the
+        best similarity seen for each chunk id.
+        """
+        variants = self.expand_query(question)
+        embeddings = [embedding] + [
+            self.embedding_generator.embed_query(v) for v in variants
+        ]
+        fetch_k = 4 * n_results if self.reranker is not None else n_results
+
+        with ThreadPoolExecutor(max_workers=len(embeddings)) as executor:
+            all_results = list(executor.map(
+                lambda e: self.vector_db.query(query_embedding=e,
+                                               n_results=fetch_k),
+                embeddings,
+            ))
+
+        best: Dict[str, Dict] = {}
+        for results in all_results:
+            if not results["ids"] or not results["ids"][0]:
+                continue
+            for chunk_id, doc, meta, distance in zip(
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+            ):
+                similarity = 1.0 - distance
+                seen = best.get(chunk_id)
+                if seen is None or similarity > seen['similarity']:
+                    best[chunk_id] = {
+                        'text': doc,
+                        'source': meta.get('filename') or meta.get('source_file', 'unknown'),
+                        'pages': meta.get('page_numbers', ''),
+                        'similarity': similarity,
+                    }
+
+        contexts = sorted(best.values(),
+                          key=lambda ctx: ctx['similarity'], reverse=True)
+        if self.reranker is not None:
+            return self.reranker.rerank(question, contexts, n_results)
+        return contexts[:n_results]
+
+    def _retrieve_by_embedding(self, question: str, embedding,
+                               n_results: int) -> List[Dict]:
+        if self.use_multi_query:
+            return self._retrieve_multi(question, embedding, n_results)
+
+        # With a reranker, over-fetch so the cross-encoder has candidates
+        # worth reordering, then cut back to n_results
+        fetch_k = 4 * n_results if self.reranker is not None else n_results
+        results = self.vector_db.query(
+            query_embedding=embedding,
+            n_results=fetch_k,
+        )
+
+        docs = results["documents"][0] if results["documents"] else []
+        metas = results["metadatas"][0] if results["metadatas"] else []
+        distances = results["distances"][0] if results["distances"] else []
+        contexts = [
+            {
+                'text': doc,
+                'source': meta.get('filename') or meta.get('source_file', 'unknown'),
+                'pages': meta.get('page_numbers', ''),
+                'similarity': 1.0 - distance,
+            }
+            for doc, meta, distance in zip(docs, metas, distances)
+        ]
+
+        if self.reranker is not None:
+            contexts = self.reranker.rerank(question, contexts, n_results)
+        return contexts
+
+    def _build_messages(self, question: str, contexts: List[Dict]) -> List[Dict]:
+        """Assemble the chat messages sent to Ollama"""
+        user_content = (
+            "Context:\n\n"
+            + "\n\n".join(
+                f"[{i}] {ctx['source']} (pages {ctx['pages']}):\n{ctx['text']}"
+                for i, ctx in enumerate(contexts, 1)
+            )
+            + f"\n\nQuestion: {question}"
+        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content},
+        ]
+
+    def _chat_payload(self, question: str, contexts: List[Dict],
+                      temperature: float) -> Dict:
+        return {
+            "model": self.ollama_model,
+            "messages": self._build_messages(question, contexts),
+            "stream": False,
+            # Keep the model (and its KV cache) resident between questions
+            # instead of unloading after Ollama's 5-minute default
+            "keep_alive": self.ollama_keep_alive,
+            "options": {"temperature": temperature},
+        }
+
+    def _build_result(self, question: str, contexts: List[Dict], data: Dict) -> Dict:
+        return {
+            'question': question,
+            'answer': data.get('message', {}).get('content', ''),
+            'sources': [
+                {'source': ctx['source'], 'pages': ctx['pages'],
+                 'similarity': round(ctx['similarity'], 3)}
+                for ctx in contexts
+            ],
+            'usage': {
+                'input_tokens': data.get('prompt_eval_count', 0),
+                'output_tokens': data.get('eval_count', 0),
+            },
+        }
+
+    def query(self, question: str, n_results: int = 5,
+              temperature: float = 0.2) -> Dict:
+        """Answer one question: retrieve context, then generate via Ollama"""
+        logger.info(f"Query: {question!r:.80}")
+        embedding = self.embedding_generator.embed_query(question)
+
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.get(embedding)
+            if cached is not None:
+                logger.info("Semantic cache hit — skipping retrieval and generation")
+                return cached
+
+        contexts = self._retrieve_by_embedding(question, embedding, n_results)
+        response = self.session.post(
+            f"{self.ollama_url}/api/chat",
+            json=self._chat_payload(question, contexts, temperature),
+            timeout=self.request_timeout,
+        )
+        response.raise_for_status()
+        result = self._build_result(question, contexts, _loads(response.content))
+
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(embedding, result)
+        return result
+
+    def query_stream(self, question: str, n_results: int = 5,
+                     temperature: float = 0.2):
+        """
+        Like query(), but yields answer fragments as Ollama produces them.
+
+        /api/chat streams NDJSON — one JSON object per generated token
+        group — so the first words appear after time-to-first-token instead
+        of after the full generation. Intended for interactive use:
+
+            for fragment in pipeline.query_stream("..."):
+                print(fragment, end='', flush=True)
+
+        Streamed answers bypass the semantic cache (the assembled result
+        dict is never materialized here).
+        """
+        logger.info(f"Query (stream): {question!r:.80}")
+        embedding = self.embedding_generator.embed_query(question)
+        contexts = self._retrieve_by_embedding(question, embedding, n_results)
+
+        payload = self._chat_payload(question, contexts, temperature)
+        payload["stream"] = True
+        with self.session.post(
+            f"{self.ollama_url}/api/chat",
+            json=payload,
+            timeout=self.request_timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = _loads(line)
+                fragment = data.get('message', {}).get('content', '')
+                if fragment:
+                    yield fragment
+                if data.get('done'):
+                    break
+
+    async def aquery(self, question: str, n_results: int = 5,
+                     temperature: float = 0.2,
+                     client: Optional["httpx.AsyncClient"] = None) -> Dict:
+        """
+        Async variant of query().
+
+        Retrieval (embedding API + Chroma) is synchronous client code, so
+        it runs in a worker thread; the long-running Ollama call is awaited
+        on the shared AsyncClient so other questions progress meanwhile.
+        """
+        embedding = await asyncio.to_thread(
+            self.embedding_generator.embed_query, question)
+
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.get(embedding)
+            if cached is not None:
+                logger.info("Semantic cache hit — skipping retrieval and generation")
+                return cached
+
+        contexts = await asyncio.to_thread(
+            self._retrieve_by_embedding, question, embedding, n_results)
+
+        owns_client = client is None
+        if owns_client:
+            if httpx is None:
+                raise RuntimeError(
+                    "httpx is required for aquery() — install it or use "
+                    "the synchronous query()/batch_query() instead")
+            client = httpx.AsyncClient(timeout=self.request_timeout)
+        try:
+            response = await client.post(
+                f"{self.ollama_url}/api/chat",
+                json=self._chat_payload(question, contexts, temperature),
+            )
+            response.raise_for_status()
+        finally:
+            if owns_client:
+                await client.aclose()
+        result = self._build_result(question, contexts, _loads(response.content))
+
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(embedding, result)
+        return result
+
+    async def abatch_query(self, questions: List[str], n_results: int = 5,
+                           temperature: float = 0.2) -> List[Dict]:
+        """Run all questions concurrently under a bounded semaphore"""
+        if httpx is None:
+            raise RuntimeError(
+                "httpx is required for abatch_query() — install it or use "
+                "the synchronous batch_query() instead")
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async with httpx.AsyncClient(timeout=self.request_timeout) as client:
+            async def one(question: str):
+                async with semaphore:
+                    return await self.aquery(
+                        question, n_results=n_results,
+                        temperature=temperature, client=client,
+                    )
+
+            return await asyncio.gather(
+                *(one(q) for q in questions),
+                return_exceptions=True,
+            )
+
+    def batch_query(self, questions: List[str], n_results: int = 5,
+                    temperature: float = 0.2) -> List[Dict]:
+        """
+        Answer many questions, overlapping retrieval and generation.
+
+        Failed questions come back as the exception object in their slot
+        (order is preserved). Falls back to a sequential loop if httpx is
+        not installed.
+        """
+        if httpx is None:
+            logger.warning("httpx not installed — answering questions sequentially")
+            results = []
+            for question in questions:
+                try:
+                    results.append(self.query(question, n_results=n_results,
+                                              temperature=temperature))
+                except Exception as e:
+                    logger.error(f"Query failed for {question!r:.60}: {e}")
+                    results.append(e)
+            return results
+
+        return asyncio.run(self.abatch_query(
+            questions, n_results=n_results, temperature=temperature,
+        ))
+
+
+def main():
+    """Example usage"""
+    pipeline = RAGPipeline()
+
+    questions = [
+        "What is this document collection about?",
+        "Summarize the key topics covered.",
+    ]
+
+    for result in pipeline.batch_query(questions, n_results=5):
+        if isinstance(result, Exception):
+            print(f"\n⚠️  Query failed: {result}")
+            continue
+        print("\n" + "-" * 70)
+        print(f"Q: {result['question']}")
+        print("-" * 70)
+        print(result['answer'])
+        print(f"\n({result['usage']['output_tokens']} output tokens)")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,12 +18,33 @@ OUTPUT_FILE  = "/ai/output/chunksnotexist.json"
 
 
 def load_chunks(path):
+    """Διαβάζει το αρχείο είτε ως JSONL (μία εγγραφή ανά γραμμή) είτε ως JSON array."""
     p = Path(path)
     if not p.exists():
         logger.warning(f"Δεν βρέθηκε: {path}")
         return []
     with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            records = json.load(f)
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    # Οι εγγραφές "document" κρατούν τα κοινά metadata — ξανασυνδέονται
+    # στα chunks τους και δεν επιστρέφονται ως chunks
+    doc_meta: dict = {}
+    chunks = []
+    for r in records:
+        if r.get("record_type") == "document":
+            doc_meta[r.get("source_file")] = r.get("metadata", {})
+            continue
+        if "metadata" not in r:
+            r["metadata"] = doc_meta.get(r.get("source_file"), {})
+        chunks.append(r)
+    return chunks
 
 
 def main():
@@ -1,30 +1,69 @@
-"""
-Δημιουργεί το /ai/output/pdf_list.csv με όλα τα PDF αρχεία
-από τον φάκελο /ai/pdfs και τους υποφακέλους του.
-
-Στήλες: filename ; full_path ; size_bytes
-"""
-
-import csv
-import os
-from pathlib import Path
-
-INPUT_DIR  = '/ai/PDF'
-OUTPUT_CSV = '/ai/output/pdf_list.csv'
-
-os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
-
-pdf_files = sorted(Path(INPUT_DIR).rglob('*.pdf'), key=lambda p: str(p))
-
-with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8', errors='replace') as f:
-    writer = csv.writer(f, delimiter=';')
-    writer.writerow(['filename', 'full_path', 'size_bytes'])
-    for p in pdf_files:
-        try:
-            size = p.stat().st_size
-        except Exception:
-            size = ''
-        writer.writerow([p.name, str(p.resolve()), size])
-
-print(f"Δημιουργήθηκε: {OUTPUT_CSV}")
-print(f"Σύνολο PDF: {len(pdf_files)}")
+"""
+Δημιουργεί το /ai/output/pdf_list.csv με όλα τα PDF αρχεία
+από τον φάκελο /ai/pdfs και τους υποφακέλους του.
+
+Στήλες: filename ; full_path ; size_bytes
+"""
+
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+INPUT_DIR  = '/ai/PDF'
+OUTPUT_CSV = '/ai/output/pdf_list.csv'
+
+os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
+
+
+def scan_tree(root):
+    """
+    Σαρώνει αναδρομικά με os.scandir — το DirEntry έχει ήδη το stat,
+    οπότε δεν γίνεται ξεχωριστό syscall ανά αρχείο όπως με rglob+stat.
+    """
+    rows = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return rows
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                rows.extend(scan_tree(entry.path))
+            elif entry.name.lower().endswith('.pdf'):
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    size = ''
+                rows.append([entry.name, os.path.abspath(entry.path), size])
+        except OSError:
+            continue
+    return rows
+
+
+# Παράλληλη σάρωση ανά υποφάκελο πρώτου επιπέδου — σε δικτυακά
+# filesystems κάθε stat είναι ένα network round-trip
+top_rows = []
+subdirs = []
+for entry in os.scandir(INPUT_DIR):
+    if entry.is_dir(follow_symlinks=False):
+        subdirs.append(entry.path)
+    elif entry.name.lower().endswith('.pdf'):
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            size = ''
+        top_rows.append([entry.name, os.path.abspath(entry.path), size])
+
+with ThreadPoolExecutor(max_workers=16) as pool:
+    for rows in pool.map(scan_tree, subdirs):
+        top_rows.extend(rows)
+
+top_rows.sort(key=lambda row: row[1])
+
+with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8', errors='replace') as f:
+    writer = csv.writer(f, delimiter=';')
+    writer.writerow(['filename', 'full_path', 'size_bytes'])
+    writer.writerows(top_rows)
+
+print(f"Δημιουργήθηκε: {OUTPUT_CSV}")
+print(f"Σύνολο PDF: {len(top_rows)}")
@@ -10,12 +10,111 @@ import os
 
 sys.path.insert(0, "/ai")
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 DB_PATH            = "/ai/chroma_db"
 COLLECTION         = "pdf_documents"
 EMBEDDED_CHUNKS    = "/ai/output/embedded_chunks.json"
+CHUNKS_DB          = "/ai/output/chunks.db"
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def sniff_format(path):
+    """Επιστρέφει 'array' ή 'jsonl' κοιτώντας τον πρώτο μη-κενό χαρακτήρα"""
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+    return "array" if first == "[" else "jsonl"
+
+
+def iter_embedded_chunks(path, fmt):
+    """Αποδίδει μία εγγραφή τη φορά χωρίς να φορτώνει όλο το αρχείο στη μνήμη"""
+    with open(path, "rb") as f:
+        if fmt == "array":
+            if ijson is not None:
+                yield from ijson.items(f, "item")
+            else:
+                # Χωρίς ijson δεν υπάρχει streaming parser για JSON array
+                yield from json.load(f)
+        else:
+            loads = orjson.loads if orjson is not None else json.loads
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+
+
+def _matches(record, target):
+    return os.path.basename(record.get("source_file", "")) == target
+
+
+def count_chunks(path, fmt, target):
+    """Πρώτο πέρασμα: μετράει σύνολο chunks και πόσα ανήκουν στο target"""
+    total = found = 0
+    for record in iter_embedded_chunks(path, fmt):
+        # Οι εγγραφές "document" (κοινά metadata) δεν μετρούν ως chunks
+        if record.get("record_type") == "document":
+            continue
+        total += 1
+        if _matches(record, target):
+            found += 1
+    return total, found
+
+
+def rewrite_without(path, fmt, target):
+    """
+    Δεύτερο πέρασμα: ξαναγράφει το αρχείο ρέοντας εγγραφή-εγγραφή σε
+    προσωρινό αρχείο και το αντικαθιστά ατομικά. Αφαιρεί και την εγγραφή
+    "document" του target, όχι μόνο τα chunks του.
+    """
+    tmp = path + ".tmp"
+    kept = 0
+    with open(tmp, "w", encoding="utf-8") as out:
+        if fmt == "array":
+            out.write("[")
+            for record in iter_embedded_chunks(path, fmt):
+                if _matches(record, target):
+                    continue
+                if kept:
+                    out.write(",")
+                out.write(_dumps(record))
+                kept += 1
+            out.write("]")
+        else:
+            for record in iter_embedded_chunks(path, fmt):
+                if _matches(record, target):
+                    continue
+                out.write(_dumps(record) + "\n")
+                kept += 1
+    os.replace(tmp, path)
+    return kept
 
 
 def find_chroma_ids(collection, target):
+    # Το φίλτρο where τρέχει μέσα στο metadata index του Chroma — μία
+    # στοχευμένη ερώτηση αντί για πλήρη σάρωση της collection
+    result = collection.get(
+        where={"$or": [{"source_file": target}, {"filename": target}]},
+        include=[],
+    )
+    if result["ids"]:
+        return result["ids"]
+
+    # Παλαιότερα chunks μπορεί να έχουν full path στο source_file —
+    # fallback σε σάρωση με σύγκριση basename
     ids, metas = [], []
     batch_size = 5000
     offset = 0
@@ -61,18 +160,25 @@ def main():
     chroma_ids = find_chroma_ids(collection, target)
     print(f"  → βρέθηκαν:        {len(chroma_ids)} chunks")
 
-    # --- embedded_chunks.json ---
+    # --- chunks.db / embedded_chunks.json ---
     chunks_found = 0
-    chunks_all   = []
-    if os.path.exists(EMBEDDED_CHUNKS):
-        with open(EMBEDDED_CHUNKS, "r", encoding="utf-8") as f:
-            chunks_all = json.load(f)
-        print(f"  embedded_chunks:   {len(chunks_all)} chunks συνολικά")
-        chunks_keep  = [c for c in chunks_all if os.path.basename(c.get("source_file", "")) != target]
-        chunks_found = len(chunks_all) - len(chunks_keep)
+    chunks_total = 0
+    chunks_fmt   = None
+    store        = None
+    if os.path.exists(CHUNKS_DB):
+        # SQLite store: μία DELETE αντί για επανεγγραφή αρχείου
+        from chunk_store import ChunkStore
+        store = ChunkStore(CHUNKS_DB)
+        chunks_total = store.count()
+        chunks_found = store.count_by_source(target)
+        print(f"  chunks.db:         {chunks_total} chunks συνολικά")
+        print(f"  → βρέθηκαν:        {chunks_found} chunks")
+    elif os.path.exists(EMBEDDED_CHUNKS):
+        chunks_fmt = sniff_format(EMBEDDED_CHUNKS)
+        chunks_total, chunks_found = count_chunks(EMBEDDED_CHUNKS, chunks_fmt, target)
+        print(f"  embedded_chunks:   {chunks_total} chunks συνολικά")
         print(f"  → βρέθηκαν:        {chunks_found} chunks")
     else:
-        chunks_keep = []
         print(f"  embedded_chunks:   δεν βρέθηκε το {EMBEDDED_CHUNKS}")
 
     if not chroma_ids and not chunks_found:
@@ -101,11 +207,13 @@ def main():
             collection.delete(ids=chroma_ids[i:i + batch_size])
         print(f"  ChromaDB:        αφαιρέθηκαν {len(chroma_ids)} chunks → έμειναν {collection.count()}")
 
-    # --- Διαγραφή από embedded_chunks.json ---
-    if chunks_found and os.path.exists(EMBEDDED_CHUNKS):
-        with open(EMBEDDED_CHUNKS, "w", encoding="utf-8") as f:
-            json.dump(chunks_keep, f, ensure_ascii=False)
-        print(f"  embedded_chunks: αφαιρέθηκαν {chunks_found} chunks → έμειναν {len(chunks_keep)}")
+    # --- Διαγραφή από chunks.db / embedded_chunks.json ---
+    if chunks_found and store is not None:
+        store.delete_by_source(target)
+        print(f"  chunks.db:       αφαιρέθηκαν {chunks_found} chunks → έμειναν {chunks_total - chunks_found}")
+    elif chunks_found and os.path.exists(EMBEDDED_CHUNKS):
+        rewrite_without(EMBEDDED_CHUNKS, chunks_fmt, target)
+        print(f"  embedded_chunks: αφαιρέθηκαν {chunks_found} chunks → έμειναν {chunks_total - chunks_found}")
 
     print("\nΈτοιμο.")
 
@@ -38,34 +38,44 @@ def main():
     print(f"Σύνολο chunks στο ChromaDB: {total_before}")
     print(f"Αναζήτηση chunks για: {target} ...")
 
-    # Φέρνουμε τα metadata σε batches (ChromaDB limit με μεγάλες collections)
-    ids, metas = [], []
-    batch_size = 5000
-    offset = 0
-    while True:
-        batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
-        if not batch["ids"]:
-            break
-        ids.extend(batch["ids"])
-        metas.extend(batch["metadatas"])
-        offset += batch_size
-
-    matching_ids = [
-        id_ for id_, meta in zip(ids, metas)
-        if os.path.basename(meta.get("source_file", "")) == target
-        or os.path.basename(meta.get("filename", "")) == target
-    ]
+    # Το φίλτρο where τρέχει μέσα στο metadata index του Chroma — μία
+    # στοχευμένη ερώτηση αντί για πλήρη σάρωση της collection
+    result = collection.get(
+        where={"$or": [{"source_file": target}, {"filename": target}]},
+        include=[],
+    )
+    matching_ids = result["ids"]
 
     if not matching_ids:
-        print(f"Δεν βρέθηκαν chunks για: {target}")
-        print("\nΔιαθέσιμα αρχεία στο ChromaDB:")
-        sources = sorted({
-            os.path.basename(m.get("source_file", "") or m.get("filename", ""))
-            for m in metas if m.get("source_file") or m.get("filename")
-        })
-        for s in sources:
-            print(f"  - {s}")
-        sys.exit(1)
+        # Παλαιότερα chunks μπορεί να έχουν full path στο source_file —
+        # fallback σε σάρωση με σύγκριση basename
+        ids, metas = [], []
+        batch_size = 5000
+        offset = 0
+        while True:
+            batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            ids.extend(batch["ids"])
+            metas.extend(batch["metadatas"])
+            offset += batch_size
+
+        matching_ids = [
+            id_ for id_, meta in zip(ids, metas)
+            if os.path.basename(meta.get("source_file", "")) == target
+            or os.path.basename(meta.get("filename", "")) == target
+        ]
+
+        if not matching_ids:
+            print(f"Δεν βρέθηκαν chunks για: {target}")
+            print("\nΔιαθέσιμα αρχεία στο ChromaDB:")
+            sources = sorted({
+                os.path.basename(m.get("source_file", "") or m.get("filename", ""))
+                for m in metas if m.get("source_file") or m.get("filename")
+            })
+            for s in sources:
+                print(f"  - {s}")
+            sys.exit(1)
 
     print(f"Βρέθηκαν {len(matching_ids)} chunks για '{target}'")
 
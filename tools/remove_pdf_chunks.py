@@ -8,7 +8,97 @@ import json
 import sys
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 EMBEDDED_CHUNKS = "/ai/output/embedded_chunks.json"
+CHUNKS_DB       = "/ai/output/chunks.db"
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def sniff_format(path):
+    """Επιστρέφει 'array' ή 'jsonl' κοιτώντας τον πρώτο μη-κενό χαρακτήρα"""
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+    return "array" if first == "[" else "jsonl"
+
+
+def iter_embedded_chunks(path, fmt):
+    """Αποδίδει μία εγγραφή τη φορά χωρίς να φορτώνει όλο το αρχείο στη μνήμη"""
+    with open(path, "rb") as f:
+        if fmt == "array":
+            if ijson is not None:
+                yield from ijson.items(f, "item")
+            else:
+                # Χωρίς ijson δεν υπάρχει streaming parser για JSON array
+                yield from json.load(f)
+        else:
+            loads = orjson.loads if orjson is not None else json.loads
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+
+
+def _matches(record, target):
+    return os.path.basename(record.get("source_file", "")) == target
+
+
+def count_chunks(path, fmt, target):
+    """Πρώτο πέρασμα: μετράει chunks και μαζεύει τα διαθέσιμα αρχεία"""
+    total = found = 0
+    sources = set()
+    for record in iter_embedded_chunks(path, fmt):
+        # Οι εγγραφές "document" (κοινά metadata) δεν μετρούν ως chunks
+        if record.get("record_type") == "document":
+            continue
+        total += 1
+        sources.add(os.path.basename(record.get("source_file", "")))
+        if _matches(record, target):
+            found += 1
+    return total, found, sources
+
+
+def rewrite_without(path, fmt, target):
+    """
+    Δεύτερο πέρασμα: ξαναγράφει το αρχείο ρέοντας εγγραφή-εγγραφή σε
+    προσωρινό αρχείο και το αντικαθιστά ατομικά. Αφαιρεί και την εγγραφή
+    "document" του target, όχι μόνο τα chunks του.
+    """
+    tmp = path + ".tmp"
+    kept = 0
+    with open(tmp, "w", encoding="utf-8") as out:
+        if fmt == "array":
+            out.write("[")
+            for record in iter_embedded_chunks(path, fmt):
+                if _matches(record, target):
+                    continue
+                if kept:
+                    out.write(",")
+                out.write(_dumps(record))
+                kept += 1
+            out.write("]")
+        else:
+            for record in iter_embedded_chunks(path, fmt):
+                if _matches(record, target):
+                    continue
+                out.write(_dumps(record) + "\n")
+                kept += 1
+    os.replace(tmp, path)
+    return kept
 
 
 def main():
@@ -16,35 +106,51 @@ def main():
         print("Χρήση: python remove_pdf_chunks.py <όνομα_αρχείου.pdf>")
         sys.exit(1)
 
-    target = sys.argv[1]
+    target = os.path.basename(sys.argv[1])
 
-    if not os.path.exists(EMBEDDED_CHUNKS):
-        print(f"Σφάλμα: δεν βρέθηκε το {EMBEDDED_CHUNKS}")
-        sys.exit(1)
+    # --- chunks.db (SQLite): μία DELETE αντί για επανεγγραφή αρχείου ---
+    if os.path.exists(CHUNKS_DB):
+        sys.path.insert(0, "/ai")
+        from chunk_store import ChunkStore
+
+        store = ChunkStore(CHUNKS_DB)
+        before = store.count()
+        found = store.count_by_source(target)
 
-    print(f"Φόρτωση {EMBEDDED_CHUNKS} ...")
-    with open(EMBEDDED_CHUNKS, "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+        if found == 0:
+            print(f"Δεν βρέθηκαν chunks για: {target}")
+            print("Διαθέσιμα αρχεία:")
+            for s in store.list_sources():
+                print(f"  - {s}")
+            sys.exit(1)
 
-    before = len(chunks)
+        print(f"Βρέθηκαν {found} chunks για '{target}'")
+        confirm = input(f"Αφαίρεση {found} chunks από {before} συνολικά; [y/N] ").strip().lower()
+        if confirm != "y":
+            print("Ακυρώθηκε.")
+            sys.exit(0)
+
+        store.delete_by_source(target)
+        print(f"Έτοιμο. Έμειναν {before - found} chunks ({found} αφαιρέθηκαν).")
+        return
+
+    if not os.path.exists(EMBEDDED_CHUNKS):
+        print(f"Σφάλμα: δεν βρέθηκε ούτε το {CHUNKS_DB} ούτε το {EMBEDDED_CHUNKS}")
+        sys.exit(1)
 
-    # Αντιστοιχία με basename ή full path
-    filtered = [
-        c for c in chunks
-        if os.path.basename(c.get("source_file", "")) != os.path.basename(target)
-    ]
+    fmt = sniff_format(EMBEDDED_CHUNKS)
 
-    removed = before - len(filtered)
+    print(f"Σάρωση {EMBEDDED_CHUNKS} ...")
+    before, removed, sources = count_chunks(EMBEDDED_CHUNKS, fmt, target)
 
     if removed == 0:
         print(f"Δεν βρέθηκαν chunks για: {target}")
         print("Διαθέσιμα αρχεία:")
-        sources = sorted({os.path.basename(c.get("source_file", "")) for c in chunks})
-        for s in sources:
+        for s in sorted(sources):
             print(f"  - {s}")
         sys.exit(1)
 
-    print(f"Βρέθηκαν {removed} chunks για '{os.path.basename(target)}'")
+    print(f"Βρέθηκαν {removed} chunks για '{target}'")
 
     confirm = input(f"Αφαίρεση {removed} chunks από {before} συνολικά; [y/N] ").strip().lower()
     if confirm != "y":
@@ -52,10 +158,9 @@ def main():
         sys.exit(0)
 
     print("Αποθήκευση ...")
-    with open(EMBEDDED_CHUNKS, "w", encoding="utf-8") as f:
-        json.dump(filtered, f, ensure_ascii=False)
+    rewrite_without(EMBEDDED_CHUNKS, fmt, target)
 
-    print(f"Έτοιμο. Έμειναν {len(filtered)} chunks ({removed} αφαιρέθηκαν).")
+    print(f"Έτοιμο. Έμειναν {before - removed} chunks ({removed} αφαιρέθηκαν).")
 
 
 if __name__ == "__main__":
@@ -5,9 +5,14 @@ Uses ChromaDB for local storage
 
 import json
 import os
+import queue
+import re
+import threading
+from collections import deque
 from typing import List, Dict, Optional, Tuple
 import logging
 from tqdm import tqdm
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
@@ -15,6 +20,115 @@ from chromadb.utils import embedding_functions
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+try:
+    # orjson parses the float-heavy records in C; stdlib json is the fallback
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    # BM25 keyword scoring for hybrid_search; without it the substring
+    # hit ratio is used instead
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _iter_embedded_chunks(path: str):
+    """
+    Yield embedded-chunk records from JSONL, or a legacy JSON array.
+
+    JSONL streams one record at a time, so the whole multi-GB file never
+    has to sit in memory at once.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            yield from json.load(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+
+
+def _iter_npy_chunks(meta_path: str, npy_path: str, block_size: int = 250):
+    """
+    Yield chunk records from a .meta.jsonl + float16 .npy vector pair
+    (the npy_sidecar export of embeddings_with_voyage).
+
+    The matrix is memory-mapped and converted to float32 one block at a
+    time, so the fp16 file is the only thing read from disk in full.
+    """
+    vectors = np.load(npy_path, mmap_mode='r')
+    block: List[List[float]] = []
+    block_base = 0
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        i = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if i >= block_base + len(block):
+                block_base = i
+                block = np.asarray(
+                    vectors[i:i + block_size], dtype=np.float32
+                ).tolist()
+            chunk = json.loads(line)
+            chunk['embedding'] = block[i - block_base]
+            yield chunk
+            i += 1
+    if i != vectors.shape[0]:
+        raise ValueError(
+            f"{meta_path} has {i} records but {npy_path} has "
+            f"{vectors.shape[0]} vectors"
+        )
+
+
+class HotShard:
+    """
+    In-RAM float16 shard answered with one matrix product.
+
+    A BLAS gemv over a 100k x 1024 float16 matrix takes tens of
+    microseconds; the equivalent Chroma HNSW query costs 1-5 ms of
+    Python/SQLite overhead. Scoring is exact (brute force) over the
+    shard, but the shard only holds the most recently loaded chunks —
+    queries that must see the whole corpus or use metadata filters
+    belong on Chroma.
+    """
+
+    def __init__(self, ids, embeddings, documents, metadatas):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = (matrix / np.maximum(norms, 1e-12)).astype(np.float16)
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query(self, query_embedding: List[float], n_results: int) -> Dict:
+        """Exact cosine top-k over the shard, in Chroma's result shape"""
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_vec = (query_vec / (np.linalg.norm(query_vec) + 1e-12)).astype(np.float16)
+
+        scores = (self.matrix @ query_vec).astype(np.float32)
+        k = min(n_results, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+
+        return {
+            'ids': [[self.ids[i] for i in top]],
+            'documents': [[self.documents[i] for i in top]],
+            'metadatas': [[self.metadatas[i] for i in top]],
+            'distances': [[float(1.0 - scores[i]) for i in top]],
+        }
+
 
 class VectorDatabase:
     """
@@ -24,7 +138,11 @@ class VectorDatabase:
     def __init__(
         self,
         db_path: str = "./chroma_db",
-        collection_name: str = "pdf_documents"
+        collection_name: str = "pdf_documents",
+        hnsw_m: Optional[int] = None,
+        hnsw_ef_construction: Optional[int] = None,
+        hnsw_ef_search: Optional[int] = None,
+        hot_shard_size: int = 0
     ):
         """
         Initialize vector database
@@ -32,9 +150,27 @@ class VectorDatabase:
         Args:
             db_path: Path to store the database
             collection_name: Name of the collection
+            hnsw_m: HNSW graph degree (Chroma default 16; 32 for
+                100k+ chunk corpora). Build-time only.
+            hnsw_ef_construction: Candidate list size while building the
+                graph (Chroma default 100; 200 raises recall). Build-time
+                only.
+            hnsw_ef_search: Candidate list size at query time (Chroma
+                default 10; 64-128 gives 98%+ recall). Adjustable later
+                via set_ef_search().
+            hot_shard_size: Keep the last N loaded chunks in an in-RAM
+                float16 matrix and answer unfiltered queries from it
+                with one matrix product, bypassing Chroma (0 = off).
+                Only serves queries while it covers the entire
+                collection; otherwise retrieval falls back to Chroma.
         """
         self.db_path = db_path
         self.collection_name = collection_name
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.hot_shard_size = hot_shard_size
+        self.hot_shard: Optional[HotShard] = None
 
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(
@@ -69,84 +205,224 @@ class VectorDatabase:
             except:
                 pass
 
+        # HNSW knobs beyond the distance metric are only applied when set,
+        # so existing collections keep whatever they were built with
+        metadata = {"hnsw:space": distance_metric}
+        if self.hnsw_m is not None:
+            metadata["hnsw:M"] = self.hnsw_m
+        if self.hnsw_ef_construction is not None:
+            metadata["hnsw:construction_ef"] = self.hnsw_ef_construction
+        if self.hnsw_ef_search is not None:
+            metadata["hnsw:search_ef"] = self.hnsw_ef_search
+
         collection = self.client.get_or_create_collection(
             name=self.collection_name,
-            metadata={"hnsw:space": distance_metric}
+            metadata=metadata
         )
 
-        logger.info(f"Collection '{self.collection_name}' ready (metric: {distance_metric})")
+        hnsw_info = ', '.join(f"{k.split(':')[1]}={v}"
+                              for k, v in metadata.items() if k != "hnsw:space")
+        logger.info(f"Collection '{self.collection_name}' ready "
+                    f"(metric: {distance_metric}"
+                    + (f", {hnsw_info}" if hnsw_info else "") + ")")
         return collection
 
+    def set_ef_search(self, ef_search: int) -> None:
+        """
+        Adjust HNSW search_ef on the live collection.
+
+        search_ef caps how many graph candidates each query inspects, so
+        it should be at least n_results; raising it trades latency for
+        recall without rebuilding the index.
+        """
+        collection = self.client.get_collection(self.collection_name)
+        try:
+            collection.modify(metadata={"hnsw:search_ef": ef_search})
+            self.hnsw_ef_search = ef_search
+            logger.info(f"HNSW search_ef set to {ef_search}")
+        except Exception as e:
+            logger.warning(f"Could not set search_ef: {e}")
+
+    def sources_index_path(self) -> str:
+        """Path of the persisted per-source chunk-count index"""
+        return os.path.join(self.db_path, "_sources_index.json")
+
+    def invalidate_sources_index(self) -> None:
+        """Drop the per-source index after the collection changed"""
+        try:
+            os.remove(self.sources_index_path())
+        except FileNotFoundError:
+            pass
+
+    def _apply_bulk_load_pragmas(self, enable: bool) -> None:
+        """
+        Best-effort SQLite tuning for one-shot bulk loads.
+
+        Disabling journalling and fsyncs is unsafe if the process crashes
+        mid-load (re-run the load in that case) — only active while
+        load_embeddings runs with fast_bulk_load=True, then reset.
+
+        The settings are per-connection and Chroma's pool hands each
+        thread its own, so every uploader thread calls this for itself;
+        the pragmas must also run outside a transaction (SQLite ignores
+        journal_mode/synchronous changes inside one), hence the raw
+        pooled connection rather than tx().
+        """
+        if enable:
+            pragmas = ['journal_mode=off', 'synchronous=off',
+                       'temp_store=memory']
+        else:
+            pragmas = ['journal_mode=wal', 'synchronous=normal',
+                       'temp_store=default']
+
+        try:
+            from chromadb.db.impl.sqlite import SqliteDB
+            sqlite_db = self.client._system.instance(SqliteDB)
+            conn = sqlite_db._conn_pool.connect()
+            for pragma in pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+            logger.info(f"SQLite pragmas set: {', '.join(pragmas)}")
+        except Exception as e:
+            logger.warning(f"Could not set bulk-load pragmas (Chroma internals changed?): {e}")
+
     def load_embeddings(
         self,
         embedded_chunks_file: str,
-        batch_size: int = 1000,
-        reset: bool = False
+        batch_size: int = 250,
+        reset: bool = False,
+        fast_bulk_load: bool = False
     ) -> int:
         """
         Load embeddings into vector database
 
         Args:
-            embedded_chunks_file: Path to embedded_chunks.json
-            batch_size: Number of embeddings to add at once
+            embedded_chunks_file: Path to embedded_chunks.json, to a
+                chunks.db SQLite store, or to the .meta.jsonl of a
+                float16 .npy sidecar export
+            batch_size: Number of embeddings to add at once (Chroma's
+                documented sweet spot is ~250)
             reset: Reset collection before loading
+            fast_bulk_load: Disable SQLite journalling/fsyncs during the
+                load (unsafe on crash — re-run the load if interrupted)
 
         Returns:
             Number of chunks loaded
         """
-        # Load embedded chunks
+        # Stream embedded chunks — upsert gives keep-last semantics for
+        # duplicate chunk IDs without materializing the file to dedupe
         logger.info(f"Loading embeddings from {embedded_chunks_file}")
-        with open(embedded_chunks_file, 'r', encoding='utf-8') as f:
-            embedded_chunks = json.load(f)
-
-        logger.info(f"Loaded {len(embedded_chunks)} embedded chunks")
-
-        # Deduplicate by chunk_id (keep last occurrence)
-        seen = {}
-        for chunk in embedded_chunks:
-            seen[chunk['chunk_id']] = chunk
-        if len(seen) < len(embedded_chunks):
-            logger.warning(f"Removed {len(embedded_chunks) - len(seen)} duplicate chunk IDs")
-        embedded_chunks = list(seen.values())
+        if embedded_chunks_file.endswith('.db'):
+            from chunk_store import ChunkStore
+            embedded_chunks = ChunkStore(embedded_chunks_file).iter_chunks()
+        elif embedded_chunks_file.endswith('.meta.jsonl'):
+            npy_path = embedded_chunks_file[:-len('.meta.jsonl')] + '.npy'
+            embedded_chunks = _iter_npy_chunks(embedded_chunks_file, npy_path)
+        else:
+            embedded_chunks = _iter_embedded_chunks(embedded_chunks_file)
 
         # Create collection
         collection = self.create_collection(reset=reset)
 
-        # Prepare data for ChromaDB
-        ids = []
-        embeddings = []
-        documents = []
-        metadatas = []
-
-        for chunk in tqdm(embedded_chunks, desc="Preparing data"):
-            ids.append(chunk['chunk_id'])
-            embeddings.append(chunk['embedding'])
-            documents.append(chunk['text'])
-
-            # Flatten metadata for ChromaDB
-            metadata = {
-                'source_file': chunk['source_file'],
-                'page_numbers': str(chunk['page_numbers']),  # Convert list to string
-                'filename': chunk['metadata'].get('filename', ''),
-                'title': chunk['metadata'].get('title', ''),
-                'author': chunk['metadata'].get('author', ''),
-            }
-            metadatas.append(metadata)
-
-        # Add to collection in batches
+        # Producer/consumer upload: batch preparation (dict building) runs
+        # on the main thread while background threads push completed
+        # batches into Chroma, overlapping prep with disk/SQLite I/O.
         logger.info("Adding embeddings to database...")
-        for i in tqdm(range(0, len(ids), batch_size), desc="Uploading batches"):
-            end_idx = min(i + batch_size, len(ids))
-
-            collection.add(
-                ids=ids[i:end_idx],
-                embeddings=embeddings[i:end_idx],
-                documents=documents[i:end_idx],
-                metadatas=metadatas[i:end_idx]
-            )
-
-        logger.info(f"Successfully loaded {len(ids)} chunks into database")
-        return len(ids)
+        if fast_bulk_load:
+            self._apply_bulk_load_pragmas(True)
+        try:
+            batch_queue: queue.Queue = queue.Queue(maxsize=8)
+            upload_errors: List[Exception] = []
+
+            def _uploader():
+                # Pragmas are per-connection and the pool is per-thread,
+                # so each uploader tunes (and on exit resets) its own
+                # connection before it returns to the pool
+                if fast_bulk_load:
+                    self._apply_bulk_load_pragmas(True)
+                try:
+                    while True:
+                        batch = batch_queue.get()
+                        if batch is None:
+                            batch_queue.task_done()
+                            break
+                        try:
+                            collection.upsert(
+                                ids=batch[0],
+                                embeddings=batch[1],
+                                documents=batch[2],
+                                metadatas=batch[3]
+                            )
+                        except Exception as e:
+                            upload_errors.append(e)
+                        finally:
+                            batch_queue.task_done()
+                finally:
+                    if fast_bulk_load:
+                        self._apply_bulk_load_pragmas(False)
+
+            uploaders = [threading.Thread(target=_uploader, daemon=True)
+                         for _ in range(4)]
+            for t in uploaders:
+                t.start()
+
+            # Ring of the most recent chunks for the in-RAM hot shard
+            hot_records = deque(maxlen=self.hot_shard_size) if self.hot_shard_size else None
+
+            ids, embeddings, documents, metadatas = [], [], [], []
+            total = 0
+            for chunk in tqdm(embedded_chunks, desc="Loading chunks"):
+                ids.append(chunk['chunk_id'])
+                embeddings.append(chunk['embedding'])
+                documents.append(chunk['text'])
+
+                # Flatten metadata for ChromaDB
+                meta = {
+                    'source_file': chunk['source_file'],
+                    'page_numbers': str(chunk['page_numbers']),  # Convert list to string
+                    'filename': chunk['metadata'].get('filename', ''),
+                    'title': chunk['metadata'].get('title', ''),
+                    'author': chunk['metadata'].get('author', ''),
+                }
+                metadatas.append(meta)
+                if hot_records is not None:
+                    hot_records.append(
+                        (chunk['chunk_id'], chunk['embedding'], chunk['text'], meta))
+
+                if len(ids) >= batch_size:
+                    batch_queue.put((ids, embeddings, documents, metadatas))
+                    total += len(ids)
+                    ids, embeddings, documents, metadatas = [], [], [], []
+
+            if ids:
+                batch_queue.put((ids, embeddings, documents, metadatas))
+                total += len(ids)
+
+            for _ in uploaders:
+                batch_queue.put(None)
+            for t in uploaders:
+                t.join()
+
+            if upload_errors:
+                raise upload_errors[0]
+        finally:
+            if fast_bulk_load:
+                self._apply_bulk_load_pragmas(False)
+
+        if hot_records:
+            shard_ids, shard_embs, shard_docs, shard_metas = zip(*hot_records)
+            self.hot_shard = HotShard(shard_ids, shard_embs, shard_docs, shard_metas)
+            collection_count = collection.count()
+            if len(self.hot_shard) < collection_count:
+                logger.warning(
+                    f"Hot shard holds {len(self.hot_shard)} of "
+                    f"{collection_count} chunks — partial coverage, queries "
+                    f"will be answered by Chroma")
+            else:
+                logger.info(f"Hot shard ready: {len(self.hot_shard)} chunks in RAM")
+
+        self.invalidate_sources_index()
+        logger.info(f"Successfully loaded {total} chunks into database")
+        return total
 
     def query(
         self,
@@ -169,6 +445,19 @@ class VectorDatabase:
         """
         collection = self.client.get_collection(self.collection_name)
 
+        # Unfiltered queries are served from the in-RAM shard when one is
+        # loaded — exact scoring, no Chroma round trip. Only when the
+        # shard covers the whole collection, though: a partial shard
+        # would silently drop every older chunk from retrieval.
+        if (self.hot_shard is not None and where is None
+                and where_document is None
+                and len(self.hot_shard) == collection.count()):
+            return self.hot_shard.query(query_embedding, n_results)
+
+        # search_ef below n_results silently truncates recall — widen it
+        if self.hnsw_ef_search is not None and n_results > self.hnsw_ef_search:
+            self.set_ef_search(n_results)
+
         results = collection.query(
             query_embeddings=[query_embedding],
             n_results=n_results,
@@ -230,13 +519,20 @@ class VectorDatabase:
         """
         collection = self.client.get_collection(self.collection_name)
 
-        # Get chunks from this source
+        # Push the filter into Chroma's metadata index instead of scanning;
+        # match both the given path and its basename on either field
+        candidates = list({source_file, os.path.basename(source_file)})
         results = collection.get(
-            where={'source_file': source_file}
+            where={'$or': [
+                {'source_file': {'$in': candidates}},
+                {'filename': {'$in': candidates}},
+            ]},
+            include=[],
         )
 
         if results['ids']:
             collection.delete(ids=results['ids'])
+            self.invalidate_sources_index()
             logger.info(f"Deleted {len(results['ids'])} chunks from {source_file}")
             return len(results['ids'])
 
@@ -269,42 +565,62 @@ class VectorDatabase:
             n_results=n_results * 2  # Get more for reranking
         )
 
-        # Keyword search using where_document
-        # Extract important keywords from query
-        keywords = query_text.lower().split()
-
-        # Simple keyword scoring (can be improved with BM25)
-        scored_results = []
-        for i, doc in enumerate(vector_results['documents'][0]):
-            doc_lower = doc.lower()
-
-            # Vector similarity score (distance)
-            vector_score = 1 - vector_results['distances'][0][i]
+        docs = vector_results['documents'][0]
+        if not docs:
+            return {'results': [], 'total_found': 0}
 
-            # Keyword score
-            keyword_score = sum(1 for kw in keywords if kw in doc_lower) / len(keywords)
-
-            # Combined score
-            combined_score = (
-                (1 - keyword_weight) * vector_score +
-                keyword_weight * keyword_score
+        # Extract important keywords from query
+        query_tokens = _TOKEN_RE.findall(query_text.lower())
+
+        # Score all candidates in numpy instead of per-row Python math.
+        # The collection stores cosine distance, so 1 - distance is the
+        # same similarity a fresh candidate @ query gemv would produce —
+        # no need to ship the raw embeddings back from Chroma.
+        vector_scores = 1.0 - np.asarray(vector_results['distances'][0], dtype=np.float32)
+
+        # BM25 over the candidate set: term frequency, IDF and document
+        # length all count, unlike a flat substring hit ratio — and
+        # get_scores returns the whole column in one call. Scores are
+        # min-max normalized so they blend with cosine similarities.
+        if query_tokens and BM25Okapi is not None:
+            tokenized_docs = [_TOKEN_RE.findall(doc.lower()) for doc in docs]
+            bm25 = BM25Okapi(tokenized_docs)
+            raw = np.asarray(bm25.get_scores(query_tokens), dtype=np.float32)
+            span = float(raw.max() - raw.min())
+            if span > 0:
+                keyword_scores = (raw - raw.min()) / span
+            else:
+                keyword_scores = np.zeros(len(docs), dtype=np.float32)
+        elif query_tokens:
+            # Fallback substring scoring when rank_bm25 is not installed
+            keyword_scores = np.fromiter(
+                (sum(1 for kw in query_tokens if kw in doc.lower()) / len(query_tokens)
+                 for doc in docs),
+                dtype=np.float32,
+                count=len(docs),
             )
+        else:
+            keyword_scores = np.zeros(len(docs), dtype=np.float32)
+
+        combined = (1 - keyword_weight) * vector_scores + keyword_weight * keyword_scores
 
-            scored_results.append({
-                'id': vector_results['ids'][0][i],
-                'document': doc,
-                'metadata': vector_results['metadatas'][0][i],
-                'score': combined_score,
-                'vector_score': vector_score,
-                'keyword_score': keyword_score
-            })
+        # argpartition picks the top n without sorting the whole candidate set
+        k = min(n_results, len(docs))
+        top = np.argpartition(combined, -k)[-k:]
+        top = top[np.argsort(combined[top])[::-1]]
 
-        # Sort by combined score
-        scored_results.sort(key=lambda x: x['score'], reverse=True)
+        results = [{
+            'id': vector_results['ids'][0][i],
+            'document': docs[i],
+            'metadata': vector_results['metadatas'][0][i],
+            'score': float(combined[i]),
+            'vector_score': float(vector_scores[i]),
+            'keyword_score': float(keyword_scores[i]),
+        } for i in top]
 
         return {
-            'results': scored_results[:n_results],
-            'total_found': len(scored_results)
+            'results': results,
+            'total_found': len(docs)
         }
 
 